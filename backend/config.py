@@ -16,14 +16,34 @@ class Settings(BaseSettings):
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
     ELEVENLABS_API_KEY: str = os.getenv("ELEVENLABS_API_KEY", "")
     
+    # Provider key pools - extra keys (comma-separated) are balanced with the key above;
+    # *_ENDPOINTS lists API roots, either one for all keys or one per key
+    DEEPGRAM_API_KEYS: str = os.getenv("DEEPGRAM_API_KEYS", "")
+    DEEPGRAM_ENDPOINTS: str = ""
+    GEMINI_API_KEYS: str = os.getenv("GEMINI_API_KEYS", "")
+    GEMINI_ENDPOINTS: str = ""
+    ELEVENLABS_API_KEYS: str = os.getenv("ELEVENLABS_API_KEYS", "")
+    ELEVENLABS_ENDPOINTS: str = ""
+    KEY_POOL_COOLDOWN: float = 30.0  # seconds a throttled key rests when no Retry-After/reset is given
+    KEY_POOL_MAX_COOLDOWN: float = 300.0  # upper bound on provider-requested cooldowns
+    
     # Deepgram settings
     DEEPGRAM_MODEL: str = "nova-2"
     DEEPGRAM_LANGUAGE: str = "tr"  # Turkish
+    DEEPGRAM_PASSTHROUGH_ENABLED: bool = True  # send WebM/Ogg Opus as-is when no conditioning is needed
+    DEEPGRAM_PASSTHROUGH_PROBE_SECONDS: float = 2.0  # audio decoded to check the level
+    DEEPGRAM_PASSTHROUGH_MIN_DBFS: float = -36.0  # quieter clips are normalized instead (~RMS 500 at 16-bit)
     
     # Gemini settings
     GEMINI_MODEL: str = "gemini-1.5-flash"
     GEMINI_TEMPERATURE: float = 0.7
     GEMINI_MAX_TOKENS: int = 1000
+    GEMINI_SYSTEM_PROMPT_FILE: str = ""  # persona text file; empty = built-in persona
+    GEMINI_CONTEXT_CACHE_ENABLED: bool = True
+    GEMINI_CONTEXT_CACHE_TTL: int = 3600  # seconds
+    GEMINI_CONTEXT_CACHE_REFRESH_MARGIN: int = 300  # refresh this many seconds before expiry
+    GEMINI_CONTEXT_CACHE_RETRY_INTERVAL: int = 600  # back-off when caching is unavailable
+    GEMINI_CONTEXT_CACHE_MIN_TOKENS: int = 32768  # provider minimum; shorter personas are sent inline
     
     # ElevenLabs settings
     ELEVENLABS_VOICE_ID: str = "21m00Tcm4TlvDq8ikWAM"  # Rachel voice
@@ -34,6 +54,81 @@ class Settings(BaseSettings):
     # Audio settings
     SAMPLE_RATE: int = 16000
     AUDIO_FORMAT: str = "wav"
+    AUDIO_DECODE_CHUNK_SIZE: int = 256 * 1024  # decoded bytes per base64 chunk
+    AUDIO_UPLOAD_CHUNK_SIZE: int = 64 * 1024  # bytes per streamed STT body chunk
+    
+    # HTTP connection pool settings
+    HTTP_POOL_SIZE: int = 100
+    HTTP_DNS_CACHE_TTL: int = 300  # seconds
+    HTTP_KEEPALIVE_TIMEOUT: float = 60.0  # seconds
+    
+    # Startup warmup settings
+    WARMUP_ON_STARTUP: bool = True
+    WARMUP_TIMEOUT: float = 5.0  # seconds
+    
+    # Batch API settings
+    BATCH_MAX_CONCURRENCY: int = 4  # batch items processed at once
+    BATCH_MAX_ITEMS: int = 100
+    BATCH_MAX_ITEM_BYTES: int = 25 * 1024 * 1024
+    BATCH_MAX_TOTAL_BYTES: int = 200 * 1024 * 1024  # all items of one request, decoded
+    BATCH_YIELD_THRESHOLD: int = 4  # interactive turns in flight at which batch work pauses
+    
+    # Load-adaptive quality tier settings
+    QUALITY_BALANCED_MAX_TOKENS: int = 400
+    QUALITY_BALANCED_TTS_MODEL: str = "eleven_turbo_v2_5"
+    QUALITY_FAST_MAX_TOKENS: int = 200
+    QUALITY_FAST_GEMINI_MODEL: str = "gemini-1.5-flash-8b"
+    QUALITY_FAST_TTS_MODEL: str = "eleven_flash_v2_5"
+    QUALITY_QUEUE_DEPTH_HIGH: int = 20  # interactive turns in flight considered overloaded
+    QUALITY_STT_TARGET: float = 1.5  # p90 stage latency targets in seconds
+    QUALITY_LLM_TARGET: float = 2.5
+    QUALITY_TTS_TARGET: float = 2.0
+    QUALITY_ERROR_RATE_HIGH: float = 0.2
+    QUALITY_MIN_SAMPLES: int = 5  # turns needed before error rate counts
+    QUALITY_WINDOW: float = 60.0  # seconds of samples considered
+    QUALITY_RECOVERY_RATIO: float = 0.5  # step back up once pressure falls below this
+    QUALITY_MIN_DWELL: float = 30.0  # minimum seconds between tier changes
+    
+    # Event loop monitoring and admin settings
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_MONITOR_INTERVAL: float = 0.1  # seconds between lag samples
+    LOOP_SLOW_CALLBACK_THRESHOLD: float = 0.1  # log the loop stack when blocked this long
+    ADMIN_TOKEN: str = os.getenv("ADMIN_TOKEN", "")  # empty disables admin endpoints
+    ADMIN_PROFILE_MAX_SECONDS: float = 60.0
+    ADMIN_PROFILE_MAX_INTERVAL_MS: float = 1000.0  # coarsest sampling interval accepted
+    
+    # Session recording settings (for tools/replay.py)
+    SESSION_RECORDING_ENABLED: bool = False
+    SESSION_RECORDING_DIR: str = "recordings"
+    
+    # Filler audio settings
+    FILLER_ENABLED: bool = True
+    FILLER_PHRASES: str = "Tamam, bir saniye.|Hmm, düşüneyim.|Anladım, hemen bakıyorum.|Güzel soru, bir dakika."  # "|"-separated
+    FILLER_VOICE_IDS: str = ""  # comma-separated; empty = ELEVENLABS_VOICE_ID
+    # Send a filler when predicted LLM+TTS time exceeds this (seconds). Until real latencies are
+    # measured the prediction is QUALITY_LLM_TARGET + QUALITY_TTS_TARGET (4.5s), so early turns get one
+    FILLER_LATENCY_THRESHOLD: float = 3.0
+    FILLER_RENDER_RETRY_BASE: float = 5.0  # first retry delay for clips that failed to render (seconds)
+    FILLER_RENDER_RETRY_MAX: float = 300.0
+    
+    # Session memory settings
+    WS_MAX_MESSAGE_BYTES: int = 16 * 1024 * 1024  # largest WebSocket message accepted (base64 audio included)
+    WS_HARD_MAX_BYTES: int = 32 * 1024 * 1024  # uvicorn closes larger frames (1009); kept above WS_MAX_MESSAGE_BYTES
+    SESSION_MEMORY_LIMIT: int = 64 * 1024 * 1024  # audio one session may hold in memory during a turn
+    TOTAL_SESSION_MEMORY_LIMIT: int = 1024 * 1024 * 1024  # across all sessions
+    AUDIO_SPILL_THRESHOLD: int = 4 * 1024 * 1024  # decoded audio above this goes to a memory-mapped temp file
+    AUDIO_SPILL_DIR: str = ""  # empty = system temp directory
+    
+    # Logging settings
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # json or text
+    LOG_QUEUE_SIZE: int = 10000  # records buffered for the writer thread; overflow is dropped
+    LOG_SAMPLE_RATES: str = "transcript=1.0,audio=0.1"  # category=rate pairs for INFO/DEBUG records
+    LOG_RATE_LIMIT: float = 50.0  # INFO/DEBUG records per second per category (0 = unlimited)
+    
+    # Health check settings
+    HEALTH_CHECK_TIMEOUT: float = 5.0  # seconds per provider check
+    HEALTH_CACHE_TTL: float = 30.0  # seconds
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,189 @@
+"""
+Logging configuration
+Non-blocking, structured logging: records are handed to a background writer
+thread through a queue, formatted there as JSON, and tagged with the current
+client_id / turn_id. Hot-path categories can be sampled and rate limited.
+"""
+
+import atexit
+import contextvars
+import logging
+import queue
+import random
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from pythonjsonlogger import jsonlogger
+
+from config import settings
+
+# Request context attached to every record logged while it is set
+client_id_var: contextvars.ContextVar[str] = contextvars.ContextVar("client_id", default="-")
+turn_id_var: contextvars.ContextVar[str] = contextvars.ContextVar("turn_id", default="-")
+
+# Loggers uvicorn configures itself when started from its CLI
+UVICORN_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+
+_listener: Optional[QueueListener] = None
+
+class ContextFilter(logging.Filter):
+    """Copies client_id / turn_id from the emitting task's context onto the record"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.client_id = client_id_var.get()
+        record.turn_id = turn_id_var.get()
+        return True
+
+class SamplingFilter(logging.Filter):
+    """
+    Per-category sampling and rate limiting for records below WARNING
+
+    The category is the record's "category" extra, or its logger name.
+    """
+
+    def __init__(self, sample_rates: Dict[str, float], rate_limit: float):
+        super().__init__()
+        self.sample_rates = sample_rates
+        self.rate_limit = rate_limit
+        self.dropped = 0
+        self._buckets: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+
+        category = getattr(record, "category", record.name)
+        rate = self.sample_rates.get(category, 1.0)
+        if rate < 1.0 and random.random() >= rate:
+            self.dropped += 1
+            return False
+
+        if self.rate_limit > 0 and not self._take_token(category):
+            self.dropped += 1
+            return False
+
+        return True
+
+    def _take_token(self, category: str) -> bool:
+        # Token bucket per category: refills rate_limit tokens per second
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(category, (self.rate_limit, now))
+            tokens = min(self.rate_limit, tokens + (now - updated) * self.rate_limit)
+            if tokens < 1.0:
+                self._buckets[category] = [tokens, now]
+                return False
+            self._buckets[category] = [tokens - 1.0, now]
+            return True
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Queue handler that leaves formatting to the writer thread
+
+    The stock QueueHandler formats the message in the calling thread, which
+    keeps the cost on the event loop. Records are passed through untouched
+    instead; the queue is bounded and overflow is dropped rather than blocking.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # uvicorn attaches an ANSI-coloured copy of its messages; JSON output would repeat it
+        record.__dict__.pop("color_message", None)
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """
+    Parses "category=rate,category=rate" into a dict
+
+    Args:
+        value: Comma-separated category=rate pairs (rate between 0 and 1)
+
+    Returns:
+        dict: Sampling rate per category
+    """
+    rates = {}
+    for pair in filter(None, (part.strip() for part in value.split(","))):
+        category, _, rate = pair.partition("=")
+        rates[category.strip()] = max(0.0, min(1.0, float(rate)))
+    return rates
+
+def setup_logging():
+    """Installs the queue-based handler on the root logger and starts the writer"""
+    global _listener
+    if _listener is not None:
+        return
+
+    if settings.LOG_FORMAT == "json":
+        formatter = jsonlogger.JsonFormatter(
+            "%(asctime)s %(levelname)s %(name)s %(client_id)s %(turn_id)s %(message)s",
+            rename_fields={"levelname": "level", "name": "logger", "asctime": "time"}
+        )
+    else:
+        formatter = logging.Formatter(
+            "%(asctime)s %(levelname)s %(name)s [%(client_id)s/%(turn_id)s] %(message)s"
+        )
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    queue_handler.addFilter(SamplingFilter(
+        parse_sample_rates(settings.LOG_SAMPLE_RATES),
+        settings.LOG_RATE_LIMIT
+    ))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(settings.LOG_LEVEL)
+
+    # Under the uvicorn CLI its loggers already have their own stream handlers;
+    # send them through the queue too (access logs are sampled as "uvicorn.access")
+    for name in UVICORN_LOGGERS:
+        uvicorn_logger = logging.getLogger(name)
+        for handler in list(uvicorn_logger.handlers):
+            uvicorn_logger.removeHandler(handler)
+        uvicorn_logger.propagate = True
+
+    _listener = QueueListener(log_queue, stream_handler)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+def shutdown_logging():
+    """Flushes queued records and stops the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def logging_stats() -> dict:
+    """
+    Returns counts of records dropped by sampling, rate limits and queue overflow
+
+    Returns:
+        dict: Dropped record counters
+    """
+    stats = {"sampled_out": 0, "queue_overflow": 0}
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, DeferredQueueHandler):
+            stats["queue_overflow"] += handler.dropped
+            for log_filter in handler.filters:
+                if isinstance(log_filter, SamplingFilter):
+                    stats["sampled_out"] += log_filter.dropped
+    return stats
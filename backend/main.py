@@ -7,20 +7,33 @@ import asyncio
 import base64
 import json
 import logging
+import math
+import secrets
+import time
 from typing import Dict, Optional
 import uuid
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Header, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 import uvicorn
 
 from services.deepgram_service import DeepgramService
 from services.gemini_service import GeminiService
 from services.elevenlabs_service import ElevenLabsService
+from services.health_service import HealthService
+from services.batch_service import BatchBudget, BatchLimitExceeded, BatchService, PriorityGate, extract_audio_items
+from services.quality_policy import QualityPolicy
+from services.audio_buffers import buffer_pool, decode_base64_into
+from services.loop_monitor import LoopLagMonitor, SamplingProfiler
+from services.session_recorder import session_recorder
+from services.filler_audio import FillerLibrary
+from services.session_memory import SessionMemoryLimitExceeded, format_bytes, session_memory
 from config import settings
+from logging_config import client_id_var, logging_stats, setup_logging, turn_id_var
 
-# Logging configuration
-logging.basicConfig(level=logging.INFO)
+# Logging configuration: JSON records written from a background thread
+setup_logging()
 logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Voice AI Agent API", version="1.0.0")
@@ -39,6 +52,31 @@ deepgram_service = DeepgramService()
 gemini_service = GeminiService()
 elevenlabs_service = ElevenLabsService()
 
+# Deep health checks run concurrently and are cached between probes
+health_service = HealthService({
+    "deepgram": deepgram_service.health_check,
+    "gemini": gemini_service.health_check,
+    "elevenlabs": elevenlabs_service.health_check
+})
+
+# Batch jobs run in their own worker pool and yield to interactive turns
+priority_gate = PriorityGate(settings.BATCH_MAX_CONCURRENCY, settings.BATCH_YIELD_THRESHOLD)
+batch_service = BatchService(deepgram_service, elevenlabs_service, priority_gate)
+
+# Steps sessions down to faster model tiers under load
+quality_policy = QualityPolicy(lambda: priority_gate.interactive_in_flight)
+
+# Event loop visibility: lag histogram, stall stacks and on-demand profiling
+loop_monitor = LoopLagMonitor(settings.LOOP_MONITOR_INTERVAL, settings.LOOP_SLOW_CALLBACK_THRESHOLD)
+profiler = SamplingProfiler()
+
+# Acknowledgement clips rendered once per voice on first use, sent while the reply is generated
+filler_library = FillerLibrary(
+    elevenlabs_service,
+    [phrase.strip() for phrase in settings.FILLER_PHRASES.split("|") if phrase.strip()],
+    [voice.strip() for voice in settings.FILLER_VOICE_IDS.split(",") if voice.strip()] or [settings.ELEVENLABS_VOICE_ID]
+)
+
 # Track active WebSocket connections
 active_connections: Dict[str, WebSocket] = {}
 
@@ -49,12 +87,15 @@ class ConnectionManager:
     async def connect(self, websocket: WebSocket, client_id: str):
         await websocket.accept()
         self.active_connections[client_id] = websocket
-        logger.info(f"Client {client_id} connected")
+        logger.info("Client %s connected", client_id)
     
     def disconnect(self, client_id: str):
+        quality_policy.clear_override(client_id)
+        session_recorder.close_session(client_id)
+        session_memory.close(client_id)
         if client_id in self.active_connections:
             del self.active_connections[client_id]
-            logger.info(f"Client {client_id} disconnected")
+            logger.info("Client %s disconnected", client_id)
     
     async def send_message(self, client_id: str, message: dict):
         websocket = self.active_connections.get(client_id)
@@ -63,6 +104,30 @@ class ConnectionManager:
 
 manager = ConnectionManager()
 
+@app.on_event("startup")
+async def startup_event():
+    """Pre-warm provider connections before the server reports ready"""
+    if settings.LOOP_MONITOR_ENABLED:
+        await loop_monitor.start()
+    
+    if settings.WARMUP_ON_STARTUP:
+        results = await asyncio.gather(
+            deepgram_service.warmup(),
+            gemini_service.warmup(),
+            elevenlabs_service.warmup()
+        )
+        logger.info("Provider warmup complete: %d/%d reachable", sum(results), len(results))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close pooled provider sessions"""
+    await loop_monitor.stop()
+    await asyncio.gather(
+        deepgram_service.close(),
+        gemini_service.close(),
+        elevenlabs_service.close()
+    )
+
 @app.get("/")
 async def root():
     return {"message": "Voice AI Agent Backend API"}
@@ -71,30 +136,250 @@ async def root():
 async def health_check():
     return {"status": "healthy", "services": "operational"}
 
+@app.get("/health/deep")
+async def deep_health_check():
+    result = await health_service.check()
+    status_code = 200 if result["status"] == "healthy" else 503
+    return JSONResponse(content=result, status_code=status_code)
+
+@app.get("/metrics")
+async def metrics():
+    return {
+        "coalescing": {
+            "gemini": gemini_service.inflight.stats(),
+            "elevenlabs": elevenlabs_service.inflight.stats()
+        },
+        "key_pools": {
+            "deepgram": deepgram_service.keys.stats(),
+            "gemini": gemini_service.keys.stats(),
+            "elevenlabs": elevenlabs_service.keys.stats()
+        },
+        "admission": priority_gate.stats(),
+        "quality": quality_policy.stats(),
+        "audio_buffers": buffer_pool.stats(),
+        "session_memory": session_memory.stats(),
+        "event_loop": loop_monitor.stats(),
+        "filler_audio": filler_library.stats(),
+        "logging": logging_stats()
+    }
+
+@app.get("/admin/profile")
+async def admin_profile(seconds: float = 10.0, interval_ms: float = 5.0,
+                        x_admin_token: Optional[str] = Header(default=None)):
+    """
+    Samples the running server and returns collapsed stacks
+    
+    The output can be fed straight into flamegraph.pl or speedscope.
+    Requires the X-Admin-Token header to match ADMIN_TOKEN.
+    """
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    if profiler.busy:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    
+    if not math.isfinite(seconds) or not math.isfinite(interval_ms):
+        raise HTTPException(status_code=400, detail="seconds and interval_ms must be finite")
+    
+    # At least one sample per profile, at most 1000 samples per second
+    seconds = min(max(seconds, 0.1), settings.ADMIN_PROFILE_MAX_SECONDS)
+    interval = min(max(interval_ms, 1.0), settings.ADMIN_PROFILE_MAX_INTERVAL_MS) / 1000
+    interval = min(interval, seconds)
+    
+    logger.info("Profiling server for %ss", seconds)
+    collapsed = await profiler.profile(seconds, interval)
+    return PlainTextResponse(collapsed, headers={
+        "Content-Disposition": "attachment; filename=profile.collapsed"
+    })
+
+def _ndjson_stream(results):
+    async def generate():
+        async for result in results:
+            yield json.dumps(result) + "\n"
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+def _check_batch_size(items: list):
+    if not items:
+        raise HTTPException(status_code=400, detail="No batch items provided")
+    if len(items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many batch items: {len(items)} (max {settings.BATCH_MAX_ITEMS})"
+        )
+
+def _batch_items(body) -> list:
+    """Returns the "items" list of a batch request body, checking its shape"""
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=400, detail="Invalid batch request: body must be a JSON object")
+    items = body.get("items", [])
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        raise HTTPException(status_code=400, detail="Invalid batch request: items must be a list of objects")
+    return items
+
+def _batch_body_limit(encoded: bool) -> int:
+    """Largest request body a batch may send; base64 JSON inflates audio by 4/3"""
+    limit = settings.BATCH_MAX_TOTAL_BYTES * 4 // 3 if encoded else settings.BATCH_MAX_TOTAL_BYTES
+    return limit + 1024 * 1024  # Room for ids, JSON syntax and multipart headers
+
+def _check_content_length(request: Request, limit: int):
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > limit:
+        raise HTTPException(status_code=413, detail=f"Batch request too large (max {limit} bytes)")
+
+async def _read_batch_body(request: Request, limit: int) -> bytes:
+    """Reads a request body, refusing it before parsing once it passes the limit"""
+    _check_content_length(request, limit)
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > limit:
+            raise HTTPException(status_code=413, detail=f"Batch request too large (max {limit} bytes)")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+def _decode_transcribe_items(body: bytes, budget: BatchBudget) -> list:
+    """Parses a JSON transcription batch and decodes its audio (blocking; run in a thread)"""
+    items = []
+    for index, item in enumerate(_batch_items(json.loads(body))):
+        item_id = str(item.get("id", index))
+        audio_data = item["audio_data"]
+        budget.admit(len(audio_data) * 3 // 4, f"Batch item {item_id}")
+        items.append((item_id, base64.b64decode(audio_data)))
+    return items
+
+@app.post("/batch/transcribe")
+async def batch_transcribe(request: Request):
+    """
+    Transcribes many clips at once
+    
+    Accepts JSON {"items": [{"id": ..., "audio_data": base64}]} or a multipart
+    upload of audio files and/or zip archives. Results stream back as NDJSON.
+    """
+    items = []
+    budget = BatchBudget()
+    content_type = request.headers.get("content-type", "")
+    
+    # The body is capped before parsing and items are checked before each is read or decoded;
+    # parsing, base64 and zip decompression run in a thread so live turns are not stalled
+    try:
+        if content_type.startswith("multipart/form-data"):
+            _check_content_length(request, _batch_body_limit(encoded=False))
+            form = await request.form(max_files=settings.BATCH_MAX_ITEMS)
+            for upload in form.values():
+                if isinstance(upload, str):
+                    continue
+                items.extend(await asyncio.to_thread(
+                    extract_audio_items, upload.filename or "upload", upload.file, budget
+                ))
+        else:
+            body = await _read_batch_body(request, _batch_body_limit(encoded=True))
+            items = await asyncio.to_thread(_decode_transcribe_items, body, budget)
+    except BatchLimitExceeded as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid batch request: {str(e)}")
+    
+    _check_batch_size(items)
+    
+    logger.info("Batch transcription started: %d items", len(items))
+    return _ndjson_stream(batch_service.transcribe(items))
+
+@app.post("/batch/synthesize")
+async def batch_synthesize(request: Request):
+    """
+    Synthesizes many texts at once
+    
+    Accepts JSON {"items": [{"id": ..., "text": ...}]}. Results stream back
+    as NDJSON with base64 audio.
+    """
+    try:
+        body = json.loads(await _read_batch_body(request, _batch_body_limit(encoded=False)))
+        items = [
+            (str(item.get("id", index)), item["text"])
+            for index, item in enumerate(_batch_items(body))
+        ]
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid batch request: {str(e)}")
+    
+    _check_batch_size(items)
+    
+    logger.info("Batch synthesis started: %d items", len(items))
+    return _ndjson_stream(batch_service.synthesize(items))
+
 @app.websocket("/ws/{client_id}")
 async def websocket_endpoint(websocket: WebSocket, client_id: str):
     await manager.connect(websocket, client_id)
+    client_id_var.set(client_id)
     
     try:
         while True:
             # Receive data from mobile client
             data = await websocket.receive_text()
+            if len(data) > settings.WS_MAX_MESSAGE_BYTES:
+                limit = format_bytes(settings.WS_MAX_MESSAGE_BYTES)
+                await manager.send_message(client_id, {
+                    "type": "error",
+                    "message": f"Message too large ({format_bytes(len(data))}, limit {limit}). Please send a shorter recording."
+                })
+                continue
             message = json.loads(data)
             
-            await process_audio_message(client_id, message)
+            async with priority_gate.interactive():
+                await process_audio_message(client_id, message)
             
     except WebSocketDisconnect:
-        manager.disconnect(client_id)
+        pass
     except Exception as e:
-        logger.error(f"WebSocket error for client {client_id}: {str(e)}")
+        logger.error("WebSocket error for client %s: %s", client_id, e)
         await manager.send_message(client_id, {
             "type": "error",
             "message": f"Server error: {str(e)}"
         })
+    finally:
+        # Always runs, even if the error report itself fails, so per-session state is released
         manager.disconnect(client_id)
 
+def _finish_stage(turn: dict, stage: str, started: float):
+    """Records a stage duration for the quality policy and the session recording"""
+    elapsed = time.perf_counter() - started
+    quality_policy.record_latency(stage, elapsed)
+    turn["timings"][stage] = round(elapsed, 4)
+
+async def _send_filler(client_id: str, turn: dict):
+    """Sends an acknowledgement clip when the reply is predicted to be slow; failures are only logged"""
+    if not settings.FILLER_ENABLED:
+        return
+    try:
+        if quality_policy.predicted_latency(["llm", "tts"]) <= settings.FILLER_LATENCY_THRESHOLD:
+            return
+        clip = filler_library.pick(settings.ELEVENLABS_VOICE_ID)
+        if clip:
+            phrase, clip_base64 = clip
+            await manager.send_message(client_id, {
+                "type": "filler_audio",
+                "audio_data": clip_base64,
+                "text": phrase
+            })
+            turn["filler"] = phrase
+    except Exception as e:
+        logger.warning("Filler audio not sent: %s", e)
+
 async def process_audio_message(client_id: str, message: dict):
     """Process incoming audio message and generate response"""
+    turn = {
+        "message_type": message.get("type"),
+        "started_at": time.time(),
+        "timings": {}
+    }
+    turn_started = time.perf_counter()
+    input_audio = b""
+    if turn["message_type"] in ("audio_data", "test_ai"):
+        turn["turn_id"] = session_recorder.next_turn_id(client_id)
+    turn_token = turn_id_var.set(str(turn.get("turn_id", "-")))
+    memory = session_memory.session(client_id)
+    
     try:
         message_type = message.get("type")
         
@@ -108,25 +393,49 @@ async def process_audio_message(client_id: str, message: dict):
                 })
                 return
             
+            # Account for the base64 text and its decoded copy; large payloads decode to disk
+            decoded_size = len(audio_base64) // 4 * 3
+            memory.charge("inbound", len(audio_base64))
+            if decoded_size <= settings.AUDIO_SPILL_THRESHOLD:
+                memory.charge("inbound", decoded_size)
+            
             # Notify client that processing has started
             await manager.send_message(client_id, {
                 "type": "status",
                 "message": "Processing audio..."
             })
             
+            # Quality tier for this turn, chosen from current load
+            tier = quality_policy.tier_for(client_id)
+            turn["tier"] = tier.name
+            
             # 1. STT with Deepgram (Speech to Text)
             try:
-                audio_bytes = base64.b64decode(audio_base64)
-                transcription = await deepgram_service.transcribe_audio(audio_bytes)
+                # Decode into a pooled buffer; STT reads it through a memoryview
+                pooled_buffer, audio_view = decode_base64_into(buffer_pool, audio_base64)
+                try:
+                    if session_recorder.enabled:
+                        input_audio = bytes(audio_view)
+                    started = time.perf_counter()
+                    transcription = await deepgram_service.transcribe_audio(
+                        audio_view,
+                        model=tier.deepgram_model,
+                        memory=memory
+                    )
+                    _finish_stage(turn, "stt", started)
+                    turn["transcript"] = transcription
+                finally:
+                    buffer_pool.release(pooled_buffer)
                 
                 if not transcription:
+                    quality_policy.record_outcome(False)
                     await manager.send_message(client_id, {
                         "type": "error", 
                         "message": "Could not transcribe audio"
                     })
                     return
                 
-                logger.info(f"Transcription: {transcription}")
+                logger.info("Transcription: %s", transcription, extra={"category": "transcript"})
                 
                 # Send transcription to client
                 await manager.send_message(client_id, {
@@ -134,14 +443,20 @@ async def process_audio_message(client_id: str, message: dict):
                     "text": transcription
                 })
                 
+            except SessionMemoryLimitExceeded:
+                raise
             except Exception as e:
-                logger.error(f"Deepgram STT error: {str(e)}")
+                logger.error("Deepgram STT error: %s", e)
+                quality_policy.record_outcome(False)
                 await manager.send_message(client_id, {
                     "type": "error",
                     "message": "Error occurred while transcribing audio"
                 })
                 return
             
+            # Mask a slow reply with an acknowledgement; the client plays the reply after it
+            await _send_filler(client_id, turn)
+            
             # 2. Generate AI response with Gemini Pro
             try:
                 await manager.send_message(client_id, {
@@ -149,16 +464,24 @@ async def process_audio_message(client_id: str, message: dict):
                     "message": "Generating AI response..."
                 })
                 
-                ai_response = await gemini_service.generate_response(transcription)
+                started = time.perf_counter()
+                ai_response = await gemini_service.generate_response(
+                    transcription,
+                    model=tier.gemini_model,
+                    max_tokens=tier.gemini_max_tokens
+                )
+                _finish_stage(turn, "llm", started)
+                turn["ai_response"] = ai_response
                 
                 if not ai_response:
+                    quality_policy.record_outcome(False)
                     await manager.send_message(client_id, {
                         "type": "error",
                         "message": "Failed to generate AI response"
                     })
                     return
                 
-                logger.info(f"AI Response: {ai_response}")
+                logger.info("AI Response: %s", ai_response, extra={"category": "transcript"})
                 
                 # Send AI response to client
                 await manager.send_message(client_id, {
@@ -167,7 +490,8 @@ async def process_audio_message(client_id: str, message: dict):
                 })
                 
             except Exception as e:
-                logger.error(f"Gemini AI error: {str(e)}")
+                logger.error("Gemini AI error: %s", e)
+                quality_policy.record_outcome(False)
                 await manager.send_message(client_id, {
                     "type": "error",
                     "message": "Error occurred while generating AI response"
@@ -181,15 +505,22 @@ async def process_audio_message(client_id: str, message: dict):
                     "message": "Generating speech..."
                 })
                 
-                audio_response = await elevenlabs_service.text_to_speech(ai_response)
+                started = time.perf_counter()
+                audio_response = await elevenlabs_service.text_to_speech(ai_response, model_id=tier.elevenlabs_model)
+                _finish_stage(turn, "tts", started)
+                turn["tts_bytes"] = len(audio_response) if audio_response else 0
                 
                 if not audio_response:
+                    quality_policy.record_outcome(False)
                     await manager.send_message(client_id, {
                         "type": "error",
                         "message": "Failed to generate speech"
                     })
                     return
                 
+                # Audio plus its base64 encoding
+                memory.charge("outbound", len(audio_response) + (len(audio_response) + 2) // 3 * 4)
+                
                 # Encode audio response as base64
                 audio_base64_response = base64.b64encode(audio_response).decode('utf-8')
                 
@@ -201,9 +532,14 @@ async def process_audio_message(client_id: str, message: dict):
                 })
                 
                 logger.info("Audio response sent successfully")
+                quality_policy.record_outcome(True)
+                turn["completed"] = True
                 
+            except SessionMemoryLimitExceeded:
+                raise
             except Exception as e:
-                logger.error(f"ElevenLabs TTS error: {str(e)}")
+                logger.error("ElevenLabs TTS error: %s", e)
+                quality_policy.record_outcome(False)
                 await manager.send_message(client_id, {
                     "type": "error",
                     "message": "Error occurred while generating speech"
@@ -220,7 +556,18 @@ async def process_audio_message(client_id: str, message: dict):
                         "message": "Generating AI response..."
                     })
                     
-                    ai_response = await gemini_service.generate_response(text)
+                    tier = quality_policy.tier_for(client_id)
+                    turn["tier"] = tier.name
+                    turn["input_text"] = text
+                    
+                    started = time.perf_counter()
+                    ai_response = await gemini_service.generate_response(
+                        text,
+                        model=tier.gemini_model,
+                        max_tokens=tier.gemini_max_tokens
+                    )
+                    _finish_stage(turn, "llm", started)
+                    turn["ai_response"] = ai_response
                     await manager.send_message(client_id, {
                         "type": "ai_response",
                         "text": ai_response
@@ -232,22 +579,29 @@ async def process_audio_message(client_id: str, message: dict):
                         "message": "Generating speech..."
                     })
                     
-                    audio_response = await elevenlabs_service.text_to_speech(ai_response)
+                    started = time.perf_counter()
+                    audio_response = await elevenlabs_service.text_to_speech(ai_response, model_id=tier.elevenlabs_model)
+                    _finish_stage(turn, "tts", started)
+                    turn["tts_bytes"] = len(audio_response) if audio_response else 0
                     if audio_response:
+                        memory.charge("outbound", len(audio_response) + (len(audio_response) + 2) // 3 * 4)
                         audio_base64_response = base64.b64encode(audio_response).decode('utf-8')
                         await manager.send_message(client_id, {
                             "type": "audio_response",
                             "audio_data": audio_base64_response,
                             "text": ai_response
                         })
+                        turn["completed"] = True
                     else:
                         await manager.send_message(client_id, {
                             "type": "error",
                             "message": "Failed to generate speech"
                         })
                         
+                except SessionMemoryLimitExceeded:
+                    raise
                 except Exception as e:
-                    logger.error(f"AI test error: {str(e)}")
+                    logger.error("AI test error: %s", e)
                     await manager.send_message(client_id, {
                         "type": "error",
                         "message": f"AI test error: {str(e)}"
@@ -258,6 +612,20 @@ async def process_audio_message(client_id: str, message: dict):
                     "message": "Test text not found"
                 })
         
+        elif message_type == "set_quality":
+            # Pin this session to a quality tier, or "auto" to follow load
+            try:
+                quality_policy.set_override(client_id, message.get("tier"))
+                await manager.send_message(client_id, {
+                    "type": "status",
+                    "message": f"Quality tier: {message.get('tier') or 'auto'}"
+                })
+            except ValueError as e:
+                await manager.send_message(client_id, {
+                    "type": "error",
+                    "message": str(e)
+                })
+        
         elif message_type == "ping":
             # Connection check
             await manager.send_message(client_id, {
@@ -265,12 +633,24 @@ async def process_audio_message(client_id: str, message: dict):
                 "message": "Connection is active"
             })
     
+    except SessionMemoryLimitExceeded as e:
+        logger.warning("Turn rejected for %s: %s", client_id, e)
+        await manager.send_message(client_id, {
+            "type": "error",
+            "message": str(e)
+        })
     except Exception as e:
-        logger.error(f"Process audio message error: {str(e)}")
+        logger.error("Process audio message error: %s", e)
         await manager.send_message(client_id, {
             "type": "error",
             "message": "Error occurred while processing the message"
         })
+    finally:
+        if session_recorder.enabled and turn["message_type"] in ("audio_data", "test_ai"):
+            turn["timings"]["total"] = round(time.perf_counter() - turn_started, 4)
+            await session_recorder.record_turn(client_id, turn, input_audio)
+        memory.end_turn()
+        turn_id_var.reset(turn_token)
 
 if __name__ == "__main__":
     uvicorn.run(
@@ -278,5 +658,8 @@ if __name__ == "__main__":
         host=settings.HOST,
         port=settings.PORT,
         log_level="info",
-        reload=True
+        log_config=None,  # uvicorn's loggers propagate to the queued handler from setup_logging
+        reload=True,
+        # Backstop only: messages between the two limits reach the app and get its explanatory error
+        ws_max_size=max(settings.WS_HARD_MAX_BYTES, settings.WS_MAX_MESSAGE_BYTES + 1)
     )
@@ -3,14 +3,44 @@ Services package
 Imports all service classes in this folder
 """
 
-from .deepgram_service import DeepgramService
+from .deepgram_service import DeepgramService, TranscriptionError
 from .gemini_service import GeminiService
 from .elevenlabs_service import ElevenLabsService
+from .health_service import HealthService
+from .http_session import PooledSession
+from .singleflight import SingleFlight
+from .batch_service import BatchService, PriorityGate
+from .quality_policy import QualityPolicy, QualityTier
+from .audio_buffers import AudioPayload, BufferPool
+from .loop_monitor import LoopLagMonitor, SamplingProfiler
+from .session_recorder import SessionRecorder, read_recording
+from .filler_audio import FillerLibrary
+from .key_pool import KeyPool, ProviderKey
+from .session_memory import SessionMemoryLimitExceeded, SessionMemoryManager
 
 __all__ = [
     'DeepgramService',
+    'TranscriptionError',
     'GeminiService', 
-    'ElevenLabsService'
+    'ElevenLabsService',
+    'HealthService',
+    'PooledSession',
+    'SingleFlight',
+    'BatchService',
+    'PriorityGate',
+    'QualityPolicy',
+    'QualityTier',
+    'AudioPayload',
+    'BufferPool',
+    'LoopLagMonitor',
+    'SamplingProfiler',
+    'SessionRecorder',
+    'read_recording',
+    'FillerLibrary',
+    'KeyPool',
+    'ProviderKey',
+    'SessionMemoryLimitExceeded',
+    'SessionMemoryManager'
 ]
 
 # Package information
@@ -0,0 +1,212 @@
+"""
+Low-copy audio buffers for the ingest path
+Pooled decode buffers, disk-backed buffers for very large clips and
+streamable upload payloads built from memoryviews
+"""
+
+import binascii
+import logging
+import mmap
+import struct
+import tempfile
+import threading
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+class SpillBuffer:
+    """
+    Writable buffer backed by a memory-mapped temporary file
+
+    Pages are file-backed, so the kernel can write them out under memory
+    pressure instead of growing the process heap.
+    """
+
+    def __init__(self, size: int):
+        self._file = tempfile.TemporaryFile(dir=settings.AUDIO_SPILL_DIR or None)
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+
+    def __len__(self) -> int:
+        return len(self._map)
+
+    def __setitem__(self, index, value):
+        self._map[index] = value
+
+    def view(self) -> memoryview:
+        return memoryview(self._map)
+
+    def close(self):
+        self._file.close()
+        try:
+            self._map.close()
+        except BufferError:
+            pass  # Still viewed; unmapped when the last memoryview is released
+
+class BufferPool:
+    def __init__(self, max_buffers_per_size: int = 8, min_size: int = 64 * 1024):
+        self.max_buffers_per_size = max_buffers_per_size
+        self.min_size = min_size
+        self._free: Dict[int, List[bytearray]] = {}
+        self._lock = threading.Lock()
+        self.allocations = 0
+        self.reuses = 0
+        self.spills = 0
+        self.spilled_bytes = 0
+
+    def acquire(self, size: int) -> bytearray:
+        """
+        Returns a buffer of at least size bytes, reusing a pooled one if possible
+
+        Args:
+            size: Minimum number of bytes needed
+
+        Returns:
+            bytearray: Buffer rounded up to a power-of-two size class
+        """
+        capacity = self._size_class(size)
+        with self._lock:
+            free = self._free.get(capacity)
+            if free:
+                self.reuses += 1
+                return free.pop()
+            self.allocations += 1
+        return bytearray(capacity)
+
+    def spill(self, size: int) -> SpillBuffer:
+        """
+        Returns a disk-backed buffer for payloads too large for the heap
+
+        Args:
+            size: Number of bytes needed
+
+        Returns:
+            SpillBuffer: Memory-mapped temporary file of exactly size bytes
+        """
+        with self._lock:
+            self.spills += 1
+            self.spilled_bytes += size
+        return SpillBuffer(size)
+
+    def release(self, buffer: Union[bytearray, SpillBuffer]):
+        """Returns a buffer to the pool (all memoryviews of it must be released)"""
+        if isinstance(buffer, SpillBuffer):
+            buffer.close()
+            return
+        with self._lock:
+            free = self._free.setdefault(len(buffer), [])
+            if len(free) < self.max_buffers_per_size:
+                free.append(buffer)
+
+    def stats(self) -> dict:
+        with self._lock:
+            pooled = sum(len(free) for free in self._free.values())
+            pooled_bytes = sum(size * len(free) for size, free in self._free.items())
+        return {
+            "allocations": self.allocations,
+            "reuses": self.reuses,
+            "pooled_buffers": pooled,
+            "pooled_bytes": pooled_bytes,
+            "spills": self.spills,
+            "spilled_bytes": self.spilled_bytes
+        }
+
+    def _size_class(self, size: int) -> int:
+        capacity = self.min_size
+        while capacity < size:
+            capacity *= 2
+        return capacity
+
+buffer_pool = BufferPool()
+
+def decode_base64_into(pool: BufferPool, encoded: str) -> Tuple[Union[bytearray, SpillBuffer], memoryview]:
+    """
+    Decodes base64 text into a pooled buffer in fixed-size chunks
+
+    Avoids materializing the whole decoded payload as a separate bytes object.
+    Payloads above AUDIO_SPILL_THRESHOLD are decoded into a memory-mapped
+    temporary file instead of the heap.
+
+    Args:
+        pool: Buffer pool to take the destination from
+        encoded: Base64 text (no whitespace)
+
+    Returns:
+        tuple: (buffer to release to the pool afterwards, memoryview of the decoded bytes)
+    """
+    if len(encoded) % 4 != 0:
+        raise binascii.Error("Invalid base64 length")
+
+    size = len(encoded) // 4 * 3
+    if size > settings.AUDIO_SPILL_THRESHOLD:
+        buffer = pool.spill(size)
+    else:
+        buffer = pool.acquire(size)
+    chunk_chars = settings.AUDIO_DECODE_CHUNK_SIZE // 3 * 4
+    offset = 0
+    try:
+        for start in range(0, len(encoded), chunk_chars):
+            chunk = binascii.a2b_base64(encoded[start:start + chunk_chars])
+            buffer[offset:offset + len(chunk)] = chunk
+            offset += len(chunk)
+    except Exception:
+        pool.release(buffer)
+        raise
+
+    view = buffer.view() if isinstance(buffer, SpillBuffer) else memoryview(buffer)
+    return buffer, view[:offset]
+
+def wav_header(data_size: int, sample_rate: int, channels: int, sample_width: int) -> bytes:
+    """
+    Builds a 44-byte PCM WAV header
+
+    Args:
+        data_size: Size of the PCM data in bytes
+        sample_rate: Frames per second
+        channels: Channel count
+        sample_width: Bytes per sample
+
+    Returns:
+        bytes: RIFF/WAVE header
+    """
+    byte_rate = sample_rate * channels * sample_width
+    block_align = channels * sample_width
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + data_size, b'WAVE',
+        b'fmt ', 16, 1, channels, sample_rate, byte_rate, block_align, sample_width * 8,
+        b'data', data_size
+    )
+
+class AudioPayload:
+    def __init__(self, parts: List[BytesLike], content_type: str, params: Optional[dict] = None):
+        self.parts = [memoryview(part) for part in parts]
+        self.content_type = content_type
+        self.params = params or {}
+
+    @property
+    def size(self) -> int:
+        return sum(part.nbytes for part in self.parts)
+
+    async def stream(self, chunk_size: Optional[int] = None) -> AsyncIterator[memoryview]:
+        """
+        Yields the payload as memoryview slices for a streamed request body
+
+        Args:
+            chunk_size: Bytes per chunk (defaults to AUDIO_UPLOAD_CHUNK_SIZE)
+
+        Yields:
+            memoryview: Next slice of the payload
+        """
+        chunk_size = chunk_size or settings.AUDIO_UPLOAD_CHUNK_SIZE
+        for part in self.parts:
+            for start in range(0, part.nbytes, chunk_size):
+                yield part[start:start + chunk_size]
+
+    def to_bytes(self) -> bytes:
+        """Materializes the payload (for callers that need a contiguous copy)"""
+        return b''.join(self.parts)
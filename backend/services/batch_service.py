@@ -0,0 +1,193 @@
+"""
+Batch transcription and synthesis
+Fans batch items out over a bounded worker pool that yields to interactive traffic
+"""
+
+import asyncio
+import base64
+import logging
+import os
+import zipfile
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, BinaryIO, Callable, List, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class BatchLimitExceeded(Exception):
+    """Raised when a batch request has too many items or too many bytes"""
+
+class BatchBudget:
+    """Running item and byte totals for one batch request, checked before each item is read"""
+
+    def __init__(self):
+        self.items = 0
+        self.bytes = 0
+
+    def admit(self, size: int, label: str = "Batch item"):
+        """
+        Reserves room for one more item
+
+        Args:
+            size: Item size in bytes (declared or estimated, before reading it)
+            label: Item description for the error message
+
+        Raises:
+            BatchLimitExceeded: If the item count, item size or total size would exceed its cap
+        """
+        if self.items >= settings.BATCH_MAX_ITEMS:
+            raise BatchLimitExceeded(f"Too many batch items (max {settings.BATCH_MAX_ITEMS})")
+        if size > settings.BATCH_MAX_ITEM_BYTES:
+            raise BatchLimitExceeded(f"{label} too large")
+        if self.bytes + size > settings.BATCH_MAX_TOTAL_BYTES:
+            raise BatchLimitExceeded(f"Batch too large (max {settings.BATCH_MAX_TOTAL_BYTES} bytes)")
+        self.items += 1
+        self.bytes += size
+
+class PriorityGate:
+    def __init__(self, batch_concurrency: int, yield_threshold: int):
+        self.yield_threshold = yield_threshold
+        self.interactive_in_flight = 0
+        self.batch_in_flight = 0
+        self._batch_semaphore = asyncio.Semaphore(batch_concurrency)
+        self._condition = asyncio.Condition()
+
+    @asynccontextmanager
+    async def interactive(self):
+        """Marks an interactive turn as in flight"""
+        self.interactive_in_flight += 1
+        try:
+            yield
+        finally:
+            self.interactive_in_flight -= 1
+            async with self._condition:
+                self._condition.notify_all()
+
+    @asynccontextmanager
+    async def batch(self):
+        """Admits one batch item once a worker slot is free and interactive load is low"""
+        async with self._batch_semaphore:
+            async with self._condition:
+                await self._condition.wait_for(
+                    lambda: self.interactive_in_flight < self.yield_threshold
+                )
+            self.batch_in_flight += 1
+            try:
+                yield
+            finally:
+                self.batch_in_flight -= 1
+
+    def stats(self) -> dict:
+        """
+        Returns admission counters
+
+        Returns:
+            dict: Interactive and batch in-flight counts
+        """
+        return {
+            "interactive_in_flight": self.interactive_in_flight,
+            "batch_in_flight": self.batch_in_flight
+        }
+
+class BatchService:
+    def __init__(self, deepgram_service, elevenlabs_service, gate: PriorityGate):
+        self.deepgram_service = deepgram_service
+        self.elevenlabs_service = elevenlabs_service
+        self.gate = gate
+
+    async def transcribe(self, items: List[Tuple[str, bytes]]) -> AsyncIterator[dict]:
+        """
+        Transcribes audio items, yielding results as they finish
+
+        Args:
+            items: (item id, audio bytes) pairs
+
+        Yields:
+            dict: Result for one item
+        """
+        async def worker(item_id: str, audio_bytes: bytes) -> dict:
+            # Failures (unsupported format, no speech, API errors) raise and
+            # are reported as status "error" by _run
+            transcription = await self.deepgram_service.transcribe(audio_bytes)
+            return {"id": item_id, "status": "ok", "text": transcription}
+
+        async for result in self._run(items, worker):
+            yield result
+
+    async def synthesize(self, items: List[Tuple[str, str]]) -> AsyncIterator[dict]:
+        """
+        Synthesizes text items, yielding results as they finish
+
+        Args:
+            items: (item id, text) pairs
+
+        Yields:
+            dict: Result for one item with base64 audio
+        """
+        async def worker(item_id: str, text: str) -> dict:
+            audio = await self.elevenlabs_service.text_to_speech(text)
+            if not audio:
+                return {"id": item_id, "status": "error", "error": "Failed to generate speech"}
+            return {
+                "id": item_id,
+                "status": "ok",
+                "audio_data": base64.b64encode(audio).decode('utf-8'),
+                "bytes": len(audio)
+            }
+
+        async for result in self._run(items, worker):
+            yield result
+
+    async def _run(self, items: list, worker: Callable[..., Awaitable[dict]]) -> AsyncIterator[dict]:
+        async def guarded(item_id: str, payload) -> dict:
+            async with self.gate.batch():
+                try:
+                    return await worker(item_id, payload)
+                except Exception as e:
+                    logger.error("Batch item %s failed: %s", item_id, e)
+                    return {"id": item_id, "status": "error", "error": str(e)}
+
+        tasks = [asyncio.ensure_future(guarded(item_id, payload)) for item_id, payload in items]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Client went away - drop the remaining work
+            for task in tasks:
+                task.cancel()
+
+def extract_audio_items(filename: str, file: BinaryIO, budget: BatchBudget) -> List[Tuple[str, bytes]]:
+    """
+    Expands an uploaded file into audio items
+
+    Each item is admitted against the request's budget before it is read,
+    so oversized archives are rejected without decompressing them.
+
+    Args:
+        filename: Name of the uploaded file
+        file: Seekable file object with the upload's contents
+        budget: Item and byte caps shared by the whole request
+
+    Returns:
+        list: (item id, audio bytes) pairs; zip archives yield one item per member
+
+    Raises:
+        BatchLimitExceeded: If the upload would exceed the request's caps
+    """
+    if not zipfile.is_zipfile(file):
+        file.seek(0, os.SEEK_END)
+        budget.admit(file.tell(), f"Upload {filename}")
+        file.seek(0)
+        return [(filename, file.read())]
+
+    items = []
+    file.seek(0)
+    with zipfile.ZipFile(file) as archive:
+        for member in archive.infolist():
+            if member.is_dir() or os.path.basename(member.filename).startswith('.'):
+                continue
+            # Reads stop at the declared size, so the header bounds what is decompressed
+            budget.admit(member.file_size, f"Archive member {member.filename}")
+            items.append((member.filename, archive.read(member)))
+    return items
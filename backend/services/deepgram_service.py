@@ -4,16 +4,24 @@ Speech to Text service with Deepgram API - Audio Format Fix
 
 import asyncio
 import logging
-from typing import Optional
+from typing import Optional, Tuple
 import aiohttp
 import json
 import io
+import struct
+import subprocess
+import tempfile
 
 from config import settings
+from .http_session import PooledSession
+from .key_pool import KeyPool, ProviderKey
+from .session_memory import SessionMemory, SessionMemoryLimitExceeded
+from .audio_buffers import AudioPayload, BytesLike, wav_header
 
 # Required for audio processing
 try:
     from pydub import AudioSegment
+    from pydub.utils import audioop, get_prober_name  # stdlib audioop, or pyaudioop on newer Pythons
     PYDUB_AVAILABLE = True
 except ImportError:
     PYDUB_AVAILABLE = False
@@ -21,201 +29,475 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Containers the STT provider decodes natively (browser MediaRecorder Opus)
+PASSTHROUGH_CONTENT_TYPES = {
+    "webm": "audio/webm",
+    "ogg": "audio/ogg"
+}
+
+class TranscriptionError(Exception):
+    """Raised when a clip produced no usable transcript; the message is user-facing"""
+
 class DeepgramService:
     def __init__(self):
-        self.api_key = settings.DEEPGRAM_API_KEY
-        self.base_url = "https://api.deepgram.com/v1/listen"
-        self.headers = {
-            "Authorization": f"Token {self.api_key}",
-            "Content-Type": "audio/wav"
-        }
+        self.keys = KeyPool.from_settings(
+            "Deepgram",
+            settings.DEEPGRAM_API_KEY,
+            settings.DEEPGRAM_API_KEYS,
+            settings.DEEPGRAM_ENDPOINTS,
+            "https://api.deepgram.com/v1"
+        )
+        self.http = PooledSession("Deepgram", f"{self.keys.keys[0].endpoint}/")
     
-    async def transcribe_audio(self, audio_bytes: bytes) -> Optional[str]:
+    async def transcribe_audio(self, audio_bytes: BytesLike, model: Optional[str] = None,
+                               memory: Optional[SessionMemory] = None) -> Optional[str]:
         """
         Transcribes audio to text using Deepgram API
         
+        Failures come back as a short message in place of the transcript;
+        use transcribe() to tell them apart.
+        
         Args:
-            audio_bytes: Audio data in bytes
+            audio_bytes: Audio data (bytes or a memoryview of a pooled buffer)
+            model: STT model override (defaults to DEEPGRAM_MODEL)
+            memory: Session accounting to charge decoded PCM to
             
         Returns:
-            str: Transcript text or None
+            str: Transcript text or a failure message
+            
+        Raises:
+            SessionMemoryLimitExceeded: If decoded PCM would exceed the session's cap
         """
         try:
-            logger.info(f"Transcribing audio: {len(audio_bytes)} bytes")
+            return await self.transcribe(audio_bytes, model, memory)
+        except TranscriptionError as e:
+            return str(e)
+    
+    async def transcribe(self, audio_bytes: BytesLike, model: Optional[str] = None,
+                         memory: Optional[SessionMemory] = None) -> str:
+        """
+        Transcribes audio to text, raising when no usable transcript was produced
+        
+        Args:
+            audio_bytes: Audio data (bytes or a memoryview of a pooled buffer)
+            model: STT model override (defaults to DEEPGRAM_MODEL)
+            memory: Session accounting to charge decoded PCM to
+            
+        Returns:
+            str: Transcript text
+            
+        Raises:
+            TranscriptionError: If the audio could not be transcribed
+            SessionMemoryLimitExceeded: If decoded PCM would exceed the session's cap
+        """
+        try:
+            logger.info("Transcribing audio: %d bytes", len(audio_bytes), extra={"category": "audio"})
             
             # Check and fix audio format
-            processed_audio = await self._process_audio_format(audio_bytes)
+            processed_audio = await self._process_audio_format(audio_bytes, memory)
             
             if not processed_audio:
                 logger.error("Audio processing failed")
-                return "Unsupported audio format"
+                raise TranscriptionError("Unsupported audio format")
             
             # Deepgram API parameters
             params = {
-                "model": settings.DEEPGRAM_MODEL,
+                "model": model or settings.DEEPGRAM_MODEL,
                 "language": settings.DEEPGRAM_LANGUAGE,
                 "smart_format": "true",
                 "punctuate": "true",
-                "encoding": "linear16",
-                "sample_rate": settings.SAMPLE_RATE,
-                "channels": 1
+                **processed_audio.params
             }
             
-            # Headers - specify content type as WAV
+            # Body is streamed from memoryviews; the length is known up front
             headers = {
-                "Authorization": f"Token {self.api_key}",
-                "Content-Type": "audio/wav"
+                "Content-Type": processed_audio.content_type,
+                "Content-Length": str(processed_audio.size)
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.base_url,
-                    headers=headers,
-                    params=params,
-                    data=processed_audio,
-                    timeout=aiohttp.ClientTimeout(total=30)
-                ) as response:
+            session = await self.http.get()
+            async with self.keys.acquire() as key, session.post(
+                f"{key.endpoint}/listen",
+                headers={**headers, "Authorization": f"Token {key.api_key}"},
+                params=params,
+                data=processed_audio.stream(),
+                timeout=aiohttp.ClientTimeout(total=30)
+            ) as response:
+                
+                self.keys.record_response(key, response.status, response.headers)
+                logger.info("Deepgram API response status: %s (%s)", response.status, key.label)
+                
+                if response.status == 200:
+                    result = await response.json()
+                    logger.debug("Deepgram response: %s", result, extra={"category": "payload"})
                     
-                    logger.info(f"Deepgram API response status: {response.status}")
+                    # Get transcript from Deepgram response
+                    alternatives = result.get("results", {}).get("channels", [{}])[0].get("alternatives", [])
                     
-                    if response.status == 200:
-                        result = await response.json()
-                        logger.info(f"Deepgram response: {result}")
+                    if alternatives:
+                        transcript = alternatives[0].get("transcript", "").strip()
+                        confidence = alternatives[0].get("confidence", 0)
                         
-                        # Get transcript from Deepgram response
-                        alternatives = result.get("results", {}).get("channels", [{}])[0].get("alternatives", [])
+                        logger.info("Transcript: %r, Confidence: %s", transcript, confidence, extra={"category": "transcript"})
                         
-                        if alternatives:
-                            transcript = alternatives[0].get("transcript", "").strip()
-                            confidence = alternatives[0].get("confidence", 0)
-                            
-                            logger.info(f"Transcript: '{transcript}', Confidence: {confidence}")
-                            
-                            # Check confidence level
-                            if confidence < 0.1:
-                                logger.warning(f"Low confidence: {confidence}")
-                                return "Poor audio quality, please try again"
-                            
-                            if transcript and len(transcript) > 0:
-                                return transcript
-                            else:
-                                logger.warning("Empty transcript received - audio might be too short or silent")
-                                return "Audio too short or silent"
+                        # Check confidence level
+                        if confidence < 0.1:
+                            logger.warning("Low confidence: %s", confidence)
+                            raise TranscriptionError("Poor audio quality, please try again")
+                        
+                        if transcript and len(transcript) > 0:
+                            return transcript
                         else:
-                            logger.warning("No alternatives found in Deepgram response")
-                            return "No speech detected"
+                            logger.warning("Empty transcript received - audio might be too short or silent")
+                            raise TranscriptionError("Audio too short or silent")
                     else:
-                        error_text = await response.text()
-                        logger.error(f"Deepgram API error {response.status}: {error_text}")
-                        return "API error occurred"
-                        
-        except aiohttp.ClientTimeout:
+                        logger.warning("No alternatives found in Deepgram response")
+                        raise TranscriptionError("No speech detected")
+                else:
+                    error_text = await response.text()
+                    logger.error("Deepgram API error %s: %s", response.status, error_text)
+                    raise TranscriptionError("API error occurred")
+                    
+        except (SessionMemoryLimitExceeded, TranscriptionError):
+            raise
+        except asyncio.TimeoutError:
             logger.error("Deepgram API timeout")
-            return "API timeout"
+            raise TranscriptionError("API timeout")
         except aiohttp.ClientError as e:
-            logger.error(f"Deepgram API client error: {str(e)}")
-            return "API connection error"
+            logger.error("Deepgram API client error: %s", e)
+            raise TranscriptionError("API connection error")
         except Exception as e:
-            logger.error(f"Deepgram transcription error: {str(e)}")
-            return "Audio processing error"
+            logger.error("Deepgram transcription error: %s", e)
+            raise TranscriptionError("Audio processing error")
     
-    async def _process_audio_format(self, audio_bytes: bytes) -> Optional[bytes]:
+    async def _process_audio_format(self, audio_bytes: BytesLike,
+                                    memory: Optional[SessionMemory] = None) -> Optional[AudioPayload]:
         """
         Converts audio format to one compatible with Deepgram
         
         Args:
             audio_bytes: Raw audio data
+            memory: Session accounting to charge decoded PCM to
             
         Returns:
-            bytes: Processed audio in WAV format or None
+            AudioPayload: Processed audio as a streamable WAV payload or None
         """
         try:
             # Minimum size check
             if len(audio_bytes) < 1000:  # Less than 1KB
-                logger.warning(f"Audio data too small: {len(audio_bytes)} bytes")
+                logger.warning("Audio data too small: %d bytes", len(audio_bytes))
                 return None
             
             # Detect audio format
             audio_format = self._detect_audio_format(audio_bytes)
-            logger.info(f"Detected audio format: {audio_format}")
+            logger.info("Detected audio format: %s", audio_format, extra={"category": "audio"})
+            
+            # Send browser Opus upstream untouched when it needs no conditioning
+            if settings.DEEPGRAM_PASSTHROUGH_ENABLED and audio_format in PASSTHROUGH_CONTENT_TYPES:
+                passthrough = await asyncio.to_thread(self._probe_passthrough, audio_bytes, audio_format)
+                if passthrough is None:
+                    return None
+                if passthrough:
+                    logger.info("Passing %s audio through without transcoding", audio_format, extra={"category": "audio"})
+                    return AudioPayload([audio_bytes], PASSTHROUGH_CONTENT_TYPES[audio_format])
             
             # If pydub not available and not WAV
             if not PYDUB_AVAILABLE:
                 if audio_format == "wav":
-                    return audio_bytes  # Use as is if WAV
+                    return self._wav_payload([audio_bytes])  # Use as is if WAV
                 else:
                     logger.warning("pydub not available, only WAV supported")
                     return None
             
-            # Convert using pydub
+            # Convert to 16kHz mono 16-bit PCM; decoding is CPU-bound and runs off the event loop
             try:
-                # Create AudioSegment based on format
-                if audio_format == "webm":
-                    audio_segment = AudioSegment.from_file(io.BytesIO(audio_bytes), format="webm")
-                elif audio_format == "mp4":
-                    audio_segment = AudioSegment.from_file(io.BytesIO(audio_bytes), format="mp4")
-                elif audio_format == "wav":
-                    audio_segment = AudioSegment.from_file(io.BytesIO(audio_bytes), format="wav")
-                elif audio_format == "ogg":
-                    audio_segment = AudioSegment.from_file(io.BytesIO(audio_bytes), format="ogg")
-                else:
-                    # Try automatic detection
-                    audio_segment = AudioSegment.from_file(io.BytesIO(audio_bytes))
-                
-                # Check audio properties
-                duration_ms = len(audio_segment)
-                logger.info(f"Audio duration: {duration_ms}ms, channels: {audio_segment.channels}, frame_rate: {audio_segment.frame_rate}Hz")
+                estimate = 0
+                if memory is not None:
+                    # Charge the decode's peak before it runs, so an oversized clip is never decoded
+                    estimate = await asyncio.to_thread(self._estimate_decoded_bytes, audio_bytes, audio_format)
+                    memory.charge("pcm", estimate)
                 
-                # Too short audio check (minimum 500ms)
-                if duration_ms < 500:
-                    logger.warning(f"Audio too short: {duration_ms}ms")
+                pcm = await asyncio.to_thread(self._condition_pcm, audio_bytes, audio_format)
+                if pcm is None:
                     return None
+                if memory is not None and len(pcm) > estimate:
+                    memory.charge("pcm", len(pcm) - estimate)
                 
-                # Optimize for Deepgram: 16kHz, mono, WAV
-                optimized_audio = audio_segment.set_frame_rate(16000).set_channels(1)
+                # WAV = generated header + the PCM, streamed without copying
+                header = wav_header(len(pcm), settings.SAMPLE_RATE, 1, 2)
+                logger.info("Processed audio: %d bytes WAV", len(header) + len(pcm), extra={"category": "audio"})
                 
-                # Check and increase audio volume if needed
-                if optimized_audio.max_possible_amplitude > 0:
-                    rms = optimized_audio.rms
-                    logger.info(f"Audio RMS level: {rms}")
-                    
-                    if rms < 500:  # Too quiet
-                        normalized_audio = optimized_audio.normalize()
-                        if normalized_audio.rms < 1000:
-                            normalized_audio = normalized_audio + 6  # Apply 6dB gain
-                            logger.info("Audio gain applied (volume was low)")
-                        optimized_audio = normalized_audio
-                
-                # Export to WAV format
-                output_buffer = io.BytesIO()
-                optimized_audio.export(
-                    output_buffer, 
-                    format="wav",
-                    parameters=[
-                        "-ac", "1",       # mono
-                        "-ar", "16000",   # 16kHz sample rate
-                        "-sample_fmt", "s16"  # 16-bit
-                    ]
-                )
-                
-                wav_data = output_buffer.getvalue()
-                logger.info(f"Processed audio: {len(wav_data)} bytes WAV")
-                
-                return wav_data
+                return self._wav_payload([header, pcm])
                 
+            except SessionMemoryLimitExceeded:
+                raise
             except Exception as e:
-                logger.error(f"Audio conversion error: {str(e)}")
+                logger.error("Audio conversion error: %s", e)
                 # Fallback: if conversion fails and format is WAV, use original
                 if audio_format == "wav":
                     logger.info("Conversion failed, using original WAV")
-                    return audio_bytes
+                    return self._wav_payload([audio_bytes])
                 return None
                 
+        except SessionMemoryLimitExceeded:
+            raise
+        except Exception as e:
+            logger.error("Audio format processing error: %s", e)
+            return None
+    
+    def _condition_pcm(self, audio_bytes: BytesLike, audio_format: str) -> Optional[BytesLike]:
+        """
+        Decodes a clip to 16kHz mono 16-bit PCM and lifts quiet recordings
+        
+        Blocking (ffmpeg, audioop, temp files); called through asyncio.to_thread.
+        
+        Args:
+            audio_bytes: Raw audio data
+            audio_format: Format from _detect_audio_format
+            
+        Returns:
+            bytes: Conditioned PCM, or None if the clip is too short
+        """
+        pcm = None
+        if audio_format == "wav":
+            # Plain PCM WAV is converted straight from the memoryview
+            pcm = self._convert_wav_pcm(audio_bytes)
+        if pcm is None:
+            pcm = self._decode_audio(audio_bytes, audio_format)
+        
+        # Check audio properties
+        duration_ms = len(pcm) // 2 * 1000 // settings.SAMPLE_RATE
+        logger.info("Audio duration: %dms, channels: 1, frame_rate: %dHz", duration_ms, settings.SAMPLE_RATE, extra={"category": "audio"})
+        
+        # Too short audio check (minimum 500ms)
+        if duration_ms < 500:
+            logger.warning("Audio too short: %dms", duration_ms)
+            return None
+        
+        # Check and increase audio volume if needed
+        rms = audioop.rms(pcm, 2)
+        logger.info("Audio RMS level: %d", rms, extra={"category": "audio"})
+        
+        if rms < 500:  # Too quiet
+            quiet_audio = AudioSegment(
+                data=bytes(pcm),
+                sample_width=2,
+                frame_rate=settings.SAMPLE_RATE,
+                channels=1
+            )
+            normalized_audio = quiet_audio.normalize()
+            if normalized_audio.rms < 1000:
+                normalized_audio = normalized_audio + 6  # Apply 6dB gain
+                logger.info("Audio gain applied (volume was low)", extra={"category": "audio"})
+            pcm = normalized_audio.raw_data
+        
+        return pcm
+    
+    def _probe_passthrough(self, audio_bytes: BytesLike, audio_format: str) -> Optional[bool]:
+        """
+        Decodes only the start of a clip to decide whether it can skip conditioning
+        
+        Args:
+            audio_bytes: Container audio data
+            audio_format: Detected container format
+            
+        Returns:
+            bool: True to pass through, False to fully convert, None if the clip is too short
+        """
+        if not PYDUB_AVAILABLE:
+            return True  # Cannot inspect the level, but the provider decodes it natively
+        
+        try:
+            with tempfile.NamedTemporaryFile(suffix=f".{audio_format}") as input_file:
+                input_file.write(audio_bytes)
+                input_file.flush()
+                probe = AudioSegment.from_file(
+                    input_file.name,
+                    format=audio_format,
+                    duration=settings.DEEPGRAM_PASSTHROUGH_PROBE_SECONDS
+                )
         except Exception as e:
-            logger.error(f"Audio format processing error: {str(e)}")
+            logger.warning("Passthrough probe failed, converting instead: %s", e)
+            return False
+        
+        # Too short audio check (minimum 500ms)
+        if len(probe) < 500:
+            logger.warning("Audio too short: %dms", len(probe))
             return None
+        
+        # dBFS is independent of the decoded sample width (Opus decodes to 32-bit)
+        logger.info("Passthrough probe level: %.1f dBFS", probe.dBFS, extra={"category": "audio"})
+        return probe.dBFS >= settings.DEEPGRAM_PASSTHROUGH_MIN_DBFS
     
-    def _detect_audio_format(self, audio_bytes: bytes) -> str:
+    def _convert_wav_pcm(self, audio_bytes: BytesLike) -> Optional[BytesLike]:
+        """
+        Converts a PCM WAV to 16kHz mono 16-bit without copying the input
+        
+        Args:
+            audio_bytes: WAV file data
+            
+        Returns:
+            bytes-like: Converted PCM (a view of the input when already in the
+            target format) or None if the WAV needs a full decode
+        """
+        fmt, data = self._wav_chunks(audio_bytes)
+        if fmt is None or data is None:
+            return None
+        
+        audio_format, channels, frame_rate, _, _, bits = fmt
+        sample_width = bits // 8
+        if audio_format != 1 or channels not in (1, 2) or sample_width not in (1, 2, 3, 4):
+            return None  # Float/extensible/multichannel - let pydub handle it
+        
+        pcm = data[:len(data) - len(data) % (channels * sample_width)]
+        if sample_width == 1:
+            pcm = audioop.bias(pcm, 1, -128)  # 8-bit WAV is unsigned
+        if channels == 2:
+            pcm = audioop.tomono(pcm, sample_width, 0.5, 0.5)
+        if sample_width != 2:
+            pcm = audioop.lin2lin(pcm, sample_width, 2)
+        if frame_rate != settings.SAMPLE_RATE:
+            pcm, _ = audioop.ratecv(pcm, 2, 1, frame_rate, settings.SAMPLE_RATE, None)
+        
+        return pcm
+    
+    def _wav_chunks(self, audio_bytes: BytesLike) -> Tuple[Optional[tuple], Optional[memoryview]]:
+        """
+        Walks the RIFF chunks looking for 'fmt ' and 'data'
+        
+        Args:
+            audio_bytes: WAV file data
+            
+        Returns:
+            tuple: (unpacked fmt fields, view of the data chunk); either may be None
+        """
+        view = memoryview(audio_bytes)
+        fmt = None
+        offset = 12
+        
+        while offset + 8 <= len(view):
+            chunk_id = bytes(view[offset:offset + 4])
+            chunk_size = int.from_bytes(view[offset + 4:offset + 8], 'little')
+            body = view[offset + 8:offset + 8 + chunk_size]
+            if chunk_id == b'fmt ' and len(body) >= 16:
+                fmt = struct.unpack('<HHIIHH', body[:16])
+            elif chunk_id == b'data':
+                return fmt, body
+            offset += 8 + chunk_size + (chunk_size & 1)
+        
+        return fmt, None
+    
+    def _estimate_decoded_bytes(self, audio_bytes: BytesLike, audio_format: str) -> int:
+        """
+        Estimates the memory a full decode of the clip will hold at its peak
+        
+        Uses the WAV header, or ffprobe for other containers, without decoding audio.
+        Blocking; called through asyncio.to_thread.
+        
+        Args:
+            audio_bytes: Raw audio data
+            audio_format: Format from _detect_audio_format
+            
+        Returns:
+            int: Decoded source plus 16kHz mono output, in bytes (0 if it cannot be estimated)
+        """
+        if audio_format == "wav":
+            fmt, data = self._wav_chunks(audio_bytes)
+            if fmt is not None and data is not None:
+                _, channels, frame_rate, _, _, bits = fmt
+                frame_bytes = channels * max(bits // 8, 1)
+                if frame_rate and frame_bytes:
+                    output = len(data) // frame_bytes * settings.SAMPLE_RATE // frame_rate * 2
+                    # Target-format PCM is used as a view of the input; anything else is converted
+                    in_target_format = (channels, bits, frame_rate) == (1, 16, settings.SAMPLE_RATE)
+                    return output + (0 if in_target_format else len(data))
+        
+        with tempfile.NamedTemporaryFile(suffix=f".{audio_format}") as input_file:
+            input_file.write(audio_bytes)
+            input_file.flush()
+            stream = self._probe_stream(input_file.name)
+        if stream is None:
+            return 0
+        
+        # Decoders may produce 32-bit samples (Opus does), so assume 4 bytes per native sample
+        duration, frame_rate, channels = stream
+        return int(duration * (frame_rate * channels * 4 + settings.SAMPLE_RATE * 2))
+    
+    def _probe_stream(self, path: str) -> Optional[Tuple[float, int, int]]:
+        """
+        Reads duration, sample rate and channel count of the first audio stream with ffprobe
+        
+        Args:
+            path: Audio file path
+            
+        Returns:
+            tuple: (duration in seconds, sample rate, channels) or None if probing failed
+        """
+        prober = [get_prober_name(), "-v", "error", "-select_streams", "a:0"]
+        try:
+            result = subprocess.run(
+                prober + ["-show_entries", "stream=sample_rate,channels:format=duration", "-of", "json", path],
+                capture_output=True, timeout=10, check=True
+            )
+            info = json.loads(result.stdout)
+            stream = info["streams"][0]
+            duration = info.get("format", {}).get("duration")
+            
+            if duration in (None, "N/A"):
+                # No container duration (MediaRecorder WebM): the last packet's timestamp
+                # gives it, and reading packets only demuxes
+                result = subprocess.run(
+                    prober + ["-show_entries", "packet=pts_time,duration_time", "-of", "csv=p=0", path],
+                    capture_output=True, timeout=10, check=True
+                )
+                pts_time, _, duration_time = result.stdout.decode().split()[-1].partition(",")
+                duration = float(pts_time) + float(duration_time or 0)
+            
+            return float(duration), int(stream["sample_rate"]), int(stream["channels"])
+        except (OSError, subprocess.SubprocessError, ValueError, KeyError, IndexError) as e:
+            logger.warning("Could not estimate decoded audio size: %s", e)
+            return None
+    
+    def _decode_audio(self, audio_bytes: BytesLike, audio_format: str) -> bytes:
+        """
+        Decodes audio with pydub and converts it to 16kHz mono 16-bit
+        
+        Args:
+            audio_bytes: Raw audio data
+            audio_format: Detected container format
+            
+        Returns:
+            bytes: 16kHz mono 16-bit PCM
+        """
+        if audio_format == "wav":
+            audio_segment = AudioSegment.from_file(io.BytesIO(audio_bytes), format="wav")
+        else:
+            # ffmpeg reads the temp file directly, so the upload is written once
+            # from the memoryview instead of being copied into Python buffers
+            with tempfile.NamedTemporaryFile(suffix=f".{audio_format}") as input_file:
+                input_file.write(audio_bytes)
+                input_file.flush()
+                audio_segment = AudioSegment.from_file(
+                    input_file.name,
+                    format=audio_format if audio_format != "unknown" else None
+                )
+        
+        optimized_audio = (
+            audio_segment
+            .set_frame_rate(settings.SAMPLE_RATE)
+            .set_channels(1)
+            .set_sample_width(2)
+        )
+        return optimized_audio.raw_data
+    
+    def _wav_payload(self, parts: list) -> AudioPayload:
+        return AudioPayload(parts, "audio/wav", {
+            "encoding": "linear16",
+            "sample_rate": settings.SAMPLE_RATE,
+            "channels": 1
+        })
+    
+    def _detect_audio_format(self, audio_bytes: BytesLike) -> str:
         """
         Detects the audio format by inspecting header bytes
         
@@ -262,13 +544,30 @@ class DeepgramService:
             bool: Whether the API is reachable
         """
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    "https://api.deepgram.com/v1/projects",
-                    headers={"Authorization": f"Token {self.api_key}"},
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as response:
-                    return response.status == 200
+            return await self.keys.check_all(self._probe_key)
         except Exception as e:
-            logger.error(f"Deepgram health check failed: {str(e)}")
+            logger.error("Deepgram health check failed: %s", e)
             return False
+    
+    async def _probe_key(self, key: ProviderKey) -> bool:
+        session = await self.http.get()
+        async with session.get(
+            f"{key.endpoint}/projects",
+            headers={"Authorization": f"Token {key.api_key}"},
+            timeout=aiohttp.ClientTimeout(total=10)
+        ) as response:
+            self.keys.record_response(key, response.status, response.headers)
+            return response.status == 200
+    
+    async def warmup(self) -> bool:
+        """
+        Pre-opens the pooled connection to the Deepgram API
+        
+        Returns:
+            bool: Whether the API host was reachable
+        """
+        return await self.http.warmup()
+    
+    async def close(self):
+        """Closes the pooled HTTP session"""
+        await self.http.close()
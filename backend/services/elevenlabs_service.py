@@ -9,71 +9,101 @@ import aiohttp
 import json
 
 from config import settings
+from .http_session import PooledSession
+from .key_pool import KeyPool, ProviderKey
+from .singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
 class ElevenLabsService:
     def __init__(self):
-        self.api_key = settings.ELEVENLABS_API_KEY
-        self.base_url = "https://api.elevenlabs.io/v1"
+        self.keys = KeyPool.from_settings(
+            "ElevenLabs",
+            settings.ELEVENLABS_API_KEY,
+            settings.ELEVENLABS_API_KEYS,
+            settings.ELEVENLABS_ENDPOINTS,
+            "https://api.elevenlabs.io/v1"
+        )
         self.voice_id = settings.ELEVENLABS_VOICE_ID
+        self.http = PooledSession("ElevenLabs", f"{self.keys.keys[0].endpoint}/")
+        self.inflight = SingleFlight("ElevenLabs TTS")
         self.headers = {
             "Accept": "audio/mpeg",
-            "Content-Type": "application/json",
-            "xi-api-key": self.api_key
+            "Content-Type": "application/json"
         }
     
-    async def text_to_speech(self, text: str) -> Optional[bytes]:
+    async def text_to_speech(self, text: str, model_id: Optional[str] = None,
+                             voice_id: Optional[str] = None) -> Optional[bytes]:
         """
         Converts text to speech using ElevenLabs API
         
         Args:
             text: Text to be converted to speech
+            model_id: TTS model override (defaults to ELEVENLABS_MODEL)
+            voice_id: Voice override (defaults to ELEVENLABS_VOICE_ID)
             
         Returns:
             bytes: Audio data or None
         """
-        try:
-            # Construct the API URL
-            url = f"{self.base_url}/text-to-speech/{self.voice_id}"
-            
-            # Prepare the request payload
-            payload = {
-                "text": text,
-                "model_id": settings.ELEVENLABS_MODEL,
-                "voice_settings": {
-                    "stability": settings.ELEVENLABS_STABILITY,
-                    "similarity_boost": settings.ELEVENLABS_SIMILARITY_BOOST,
-                    "style": 0.0,
-                    "use_speaker_boost": True
-                }
+        voice_id = voice_id or self.voice_id
+        
+        # Path under the API root of whichever key serves the request
+        path = f"/text-to-speech/{voice_id}"
+        
+        # Prepare the request payload
+        payload = {
+            "text": text,
+            "model_id": model_id or settings.ELEVENLABS_MODEL,
+            "voice_settings": {
+                "stability": settings.ELEVENLABS_STABILITY,
+                "similarity_boost": settings.ELEVENLABS_SIMILARITY_BOOST,
+                "style": 0.0,
+                "use_speaker_boost": True
             }
+        }
+        
+        # Identical (text, voice, settings) requests share one upstream call
+        key = (voice_id, json.dumps(payload, sort_keys=True))
+        return await self.inflight.do(key, lambda: self._synthesize(path, payload))
+    
+    async def _synthesize(self, path: str, payload: dict) -> Optional[bytes]:
+        """
+        Sends a synthesis request to the ElevenLabs API
+        
+        Args:
+            path: Text-to-speech path for the voice
+            payload: Request payload
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    url,
-                    headers=self.headers,
-                    json=payload,
-                    timeout=aiohttp.ClientTimeout(total=60)  # TTS may take longer
-                ) as response:
+        Returns:
+            bytes: Audio data or None
+        """
+        try:
+            session = await self.http.get()
+            async with self.keys.acquire() as key, session.post(
+                f"{key.endpoint}{path}",
+                headers={**self.headers, "xi-api-key": key.api_key},
+                json=payload,
+                timeout=aiohttp.ClientTimeout(total=60)  # TTS may take longer
+            ) as response:
+                
+                self.keys.record_response(key, response.status, response.headers)
+                if response.status == 200:
+                    audio_data = await response.read()
+                    logger.info("TTS successful, audio size: %d bytes", len(audio_data), extra={"category": "audio"})
+                    return audio_data
+                else:
+                    error_text = await response.text()
+                    logger.error("ElevenLabs API error %s: %s", response.status, error_text)
+                    return None
                     
-                    if response.status == 200:
-                        audio_data = await response.read()
-                        logger.info(f"TTS successful, audio size: {len(audio_data)} bytes")
-                        return audio_data
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"ElevenLabs API error {response.status}: {error_text}")
-                        return None
-                        
-        except aiohttp.ClientTimeout:
+        except asyncio.TimeoutError:
             logger.error("ElevenLabs API timeout")
             return None
         except aiohttp.ClientError as e:
-            logger.error(f"ElevenLabs API client error: {str(e)}")
+            logger.error("ElevenLabs API client error: %s", e)
             return None
         except Exception as e:
-            logger.error(f"ElevenLabs TTS error: {str(e)}")
+            logger.error("ElevenLabs TTS error: %s", e)
             return None
     
     async def get_available_voices(self) -> Optional[list]:
@@ -84,27 +114,28 @@ class ElevenLabsService:
             list: List of voices or None
         """
         try:
-            url = f"{self.base_url}/voices"
+            key = self.keys.select()
+            url = f"{key.endpoint}/voices"
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    url,
-                    headers={"xi-api-key": self.api_key},
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as response:
+            session = await self.http.get()
+            async with session.get(
+                url,
+                headers={"xi-api-key": key.api_key},
+                timeout=aiohttp.ClientTimeout(total=10)
+            ) as response:
+                
+                if response.status == 200:
+                    result = await response.json()
+                    voices = result.get("voices", [])
+                    logger.info("Retrieved %d voices", len(voices))
+                    return voices
+                else:
+                    error_text = await response.text()
+                    logger.error("Failed to get voices %s: %s", response.status, error_text)
+                    return None
                     
-                    if response.status == 200:
-                        result = await response.json()
-                        voices = result.get("voices", [])
-                        logger.info(f"Retrieved {len(voices)} voices")
-                        return voices
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"Failed to get voices {response.status}: {error_text}")
-                        return None
-                        
         except Exception as e:
-            logger.error(f"Get voices error: {str(e)}")
+            logger.error("Get voices error: %s", e)
             return None
     
     async def health_check(self) -> bool:
@@ -115,19 +146,21 @@ class ElevenLabsService:
             bool: Whether the API is reachable
         """
         try:
-            url = f"{self.base_url}/user"
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    url,
-                    headers={"xi-api-key": self.api_key},
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as response:
-                    return response.status == 200
+            return await self.keys.check_all(self._probe_key)
         except Exception as e:
-            logger.error(f"ElevenLabs health check failed: {str(e)}")
+            logger.error("ElevenLabs health check failed: %s", e)
             return False
     
+    async def _probe_key(self, key: ProviderKey) -> bool:
+        session = await self.http.get()
+        async with session.get(
+            f"{key.endpoint}/user",
+            headers={"xi-api-key": key.api_key},
+            timeout=aiohttp.ClientTimeout(total=10)
+        ) as response:
+            self.keys.record_response(key, response.status, response.headers)
+            return response.status == 200
+    
     async def get_voice_info(self, voice_id: str) -> Optional[dict]:
         """
         Retrieves information about a specific voice
@@ -139,24 +172,38 @@ class ElevenLabsService:
             dict: Voice information or None
         """
         try:
-            url = f"{self.base_url}/voices/{voice_id}"
+            key = self.keys.select()
+            url = f"{key.endpoint}/voices/{voice_id}"
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    url,
-                    headers={"xi-api-key": self.api_key},
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as response:
+            session = await self.http.get()
+            async with session.get(
+                url,
+                headers={"xi-api-key": key.api_key},
+                timeout=aiohttp.ClientTimeout(total=10)
+            ) as response:
+                
+                if response.status == 200:
+                    voice_info = await response.json()
+                    logger.info("Voice info retrieved for %s", voice_id)
+                    return voice_info
+                else:
+                    error_text = await response.text()
+                    logger.error("Failed to get voice info %s: %s", response.status, error_text)
+                    return None
                     
-                    if response.status == 200:
-                        voice_info = await response.json()
-                        logger.info(f"Voice info retrieved for {voice_id}")
-                        return voice_info
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"Failed to get voice info {response.status}: {error_text}")
-                        return None
-                        
         except Exception as e:
-            logger.error(f"Get voice info error: {str(e)}")
+            logger.error("Get voice info error: %s", e)
             return None
+    
+    async def warmup(self) -> bool:
+        """
+        Pre-opens the pooled connection to the ElevenLabs API
+        
+        Returns:
+            bool: Whether the API host was reachable
+        """
+        return await self.http.warmup()
+    
+    async def close(self):
+        """Closes the pooled HTTP session"""
+        await self.http.close()
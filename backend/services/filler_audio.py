@@ -0,0 +1,121 @@
+"""
+Pre-rendered acknowledgement audio
+Short filler clips ("One moment.") are synthesized once per voice, the first
+time that voice needs one, and kept in memory, so one can be sent the moment
+STT finishes while the real reply is still being generated
+"""
+
+import asyncio
+import base64
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class FillerLibrary:
+    def __init__(self, elevenlabs, phrases: List[str], voice_ids: List[str]):
+        self.elevenlabs = elevenlabs
+        self.phrases = phrases
+        self.voice_ids = voice_ids
+        self.sent = 0
+        # voice_id -> [(phrase, base64 audio)]; encoded once, reused every turn
+        self._clips: Dict[str, List[Tuple[str, str]]] = {}
+        self._next: Dict[str, int] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._failures: Dict[str, int] = {}
+        self._retry_at: Dict[str, float] = {}
+
+    async def render(self, voice_id: str) -> int:
+        """
+        Synthesizes the phrases a voice is still missing
+
+        Failed phrases are retried on a later pick, backing off exponentially.
+
+        Args:
+            voice_id: Voice to render
+
+        Returns:
+            int: Number of clips available for the voice
+        """
+        rendered = {phrase for phrase, _ in self._clips.get(voice_id, [])}
+        missing = [phrase for phrase in self.phrases if phrase not in rendered]
+        results = await asyncio.gather(
+            *(self.elevenlabs.text_to_speech(phrase, voice_id=voice_id) for phrase in missing),
+            return_exceptions=True
+        )
+
+        clips = list(self._clips.get(voice_id, []))
+        failed = 0
+        for phrase, audio in zip(missing, results):
+            if isinstance(audio, bytes) and audio:
+                clips.append((phrase, base64.b64encode(audio).decode('utf-8')))
+            else:
+                failed += 1
+                logger.warning("Filler clip could not be rendered for voice %s: %r", voice_id, phrase)
+        if clips:
+            self._clips[voice_id] = clips
+
+        if failed:
+            self._failures[voice_id] = self._failures.get(voice_id, 0) + 1
+            delay = min(
+                settings.FILLER_RENDER_RETRY_BASE * 2 ** (self._failures[voice_id] - 1),
+                settings.FILLER_RENDER_RETRY_MAX
+            )
+            self._retry_at[voice_id] = time.monotonic() + delay
+            logger.info("Retrying %d filler clips for voice %s in %.0fs", failed, voice_id, delay)
+        else:
+            self._failures.pop(voice_id, None)
+            self._retry_at.pop(voice_id, None)
+
+        logger.info("Filler audio ready for voice %s: %d/%d clips", voice_id, len(clips), len(self.phrases))
+        return len(clips)
+
+    def pick(self, voice_id: str) -> Optional[Tuple[str, str]]:
+        """
+        Returns the next clip for a voice, rotating so replies don't repeat
+
+        A voice's clips are rendered in the background on its first pick (and
+        re-tried after failures), so no TTS quota is spent on voices never used.
+
+        Args:
+            voice_id: Voice the reply will be spoken in
+
+        Returns:
+            tuple: (phrase, base64 audio), or None if no clip is rendered yet
+        """
+        if voice_id not in self.voice_ids:
+            return None
+
+        clips = self._clips.get(voice_id, [])
+        if len(clips) < len(self.phrases):
+            self._schedule_render(voice_id)
+        if not clips:
+            return None
+
+        index = self._next.get(voice_id, 0)
+        self._next[voice_id] = (index + 1) % len(clips)
+        self.sent += 1
+        return clips[index % len(clips)]
+
+    def _schedule_render(self, voice_id: str):
+        task = self._tasks.get(voice_id)
+        if task is not None and not task.done():
+            return
+        if time.monotonic() < self._retry_at.get(voice_id, 0.0):
+            return
+        self._tasks[voice_id] = asyncio.create_task(self.render(voice_id))
+
+    def stats(self) -> dict:
+        """
+        Returns clip counts and how many fillers were sent
+
+        Returns:
+            dict: Clips per voice and sent count
+        """
+        return {
+            "clips": {voice_id: len(clips) for voice_id, clips in self._clips.items()},
+            "sent": self.sent
+        }
@@ -4,93 +4,172 @@ AI response generation service using Google Gemini Pro API
 
 import asyncio
 import logging
-from typing import Optional
+import time
+from typing import Dict, Optional, Tuple
 import aiohttp
 import json
 
 from config import settings
+from .http_session import PooledSession
+from .key_pool import KeyPool, ProviderKey
+from .singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
+# System prompt - defines the AI agent's persona (GEMINI_SYSTEM_PROMPT_FILE replaces it)
+SYSTEM_PROMPT = """You are a helpful, friendly, and intelligent Turkish-speaking AI assistant.
+Talk to users naturally, answer their questions, and assist them.
+Keep your responses short and concise (maximum 2-3 sentences), as this is a voice conversation.
+Use a warm and friendly tone."""
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) used to gate context caching"""
+    return len(text) // 4
+
+def load_system_prompt() -> str:
+    """
+    Returns the persona from GEMINI_SYSTEM_PROMPT_FILE, or the built-in one
+    
+    Returns:
+        str: System prompt text
+    """
+    if not settings.GEMINI_SYSTEM_PROMPT_FILE:
+        return SYSTEM_PROMPT
+    try:
+        with open(settings.GEMINI_SYSTEM_PROMPT_FILE, encoding='utf-8') as prompt_file:
+            prompt = prompt_file.read().strip()
+    except OSError as e:
+        logger.error("Could not read GEMINI_SYSTEM_PROMPT_FILE, using the built-in persona: %s", e)
+        return SYSTEM_PROMPT
+    return prompt or SYSTEM_PROMPT
+
 class GeminiService:
     def __init__(self):
-        self.api_key = settings.GEMINI_API_KEY
-        self.base_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent"
+        self.keys = KeyPool.from_settings(
+            "Gemini",
+            settings.GEMINI_API_KEY,
+            settings.GEMINI_API_KEYS,
+            settings.GEMINI_ENDPOINTS,
+            "https://generativelanguage.googleapis.com/v1beta"
+        )
         self.conversation_history = []
+        self.system_prompt = load_system_prompt()
+        self.http = PooledSession("Gemini", f"{self.keys.keys[0].endpoint}/")
+        self.inflight = SingleFlight("Gemini")
+        
+        # Provider-side context caches for the static persona, per (key, model):
+        # a cache created with one key is not visible to another
+        self.context_caches: Dict[Tuple[str, str], dict] = {}
+        self.cache_disabled_until: Dict[Tuple[str, str], float] = {}
+        self._cache_locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self._cache_tasks: Dict[Tuple[str, str], asyncio.Task] = {}
+        
+        # cachedContents rejects content below the model's minimum token count,
+        # so a short persona would only ever pay for failed creation attempts;
+        # large personas (e.g. with reference material) come from GEMINI_SYSTEM_PROMPT_FILE
+        persona_tokens = estimate_tokens(self.system_prompt)
+        self.cache_eligible = persona_tokens >= settings.GEMINI_CONTEXT_CACHE_MIN_TOKENS
+        if settings.GEMINI_CONTEXT_CACHE_ENABLED and not self.cache_eligible:
+            logger.info(
+                "Gemini context caching skipped: persona is ~%d tokens, below the %d-token minimum",
+                persona_tokens, settings.GEMINI_CONTEXT_CACHE_MIN_TOKENS
+            )
     
-    async def generate_response(self, user_input: str) -> Optional[str]:
+    async def generate_response(self, user_input: str, model: Optional[str] = None,
+                                max_tokens: Optional[int] = None) -> Optional[str]:
         """
         Generates a response to user input using Gemini Pro
         
         Args:
             user_input: Text spoken by the user
+            model: Gemini model override (defaults to GEMINI_MODEL)
+            max_tokens: Output token limit override (defaults to GEMINI_MAX_TOKENS)
             
         Returns:
             str: AI response or None
         """
-        try:
-            # System prompt - defines the AI agent's persona
-            system_prompt = """You are a helpful, friendly, and intelligent Turkish-speaking AI assistant.
-            Talk to users naturally, answer their questions, and assist them.
-            Keep your responses short and concise (maximum 2-3 sentences), as this is a voice conversation.
-            Use a warm and friendly tone."""
-            
-            # Update conversation history
-            self.conversation_history.append({
-                "role": "user",
-                "parts": [{"text": user_input}]
-            })
-            
-            # Prepare payload for the API request
-            payload = {
-                "contents": [
-                    {
-                        "role": "user", 
-                        "parts": [{"text": f"{system_prompt}\n\nUser: {user_input}"}]
-                    }
-                ],
-                "generationConfig": {
-                    "temperature": settings.GEMINI_TEMPERATURE,
-                    "maxOutputTokens": settings.GEMINI_MAX_TOKENS,
-                    "topP": 0.8,
-                    "topK": 40
-                },
-                "safetySettings": [
-                    {
-                        "category": "HARM_CATEGORY_HARASSMENT",
-                        "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-                    },
-                    {
-                        "category": "HARM_CATEGORY_HATE_SPEECH", 
-                        "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-                    },
-                    {
-                        "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                        "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-                    },
-                    {
-                        "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
-                        "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-                    }
-                ]
-            }
-            
-            headers = {
-                "Content-Type": "application/json"
-            }
-            
-            params = {
-                "key": self.api_key
-            }
+        # Update conversation history
+        self.conversation_history.append({
+            "role": "user",
+            "parts": [{"text": user_input}]
+        })
+        
+        model = model or settings.GEMINI_MODEL
+        max_tokens = max_tokens or settings.GEMINI_MAX_TOKENS
+        
+        # The upstream request is stateless, so identical prompts share one call
+        key = (model, settings.GEMINI_TEMPERATURE, max_tokens, user_input)
+        ai_response, fallback_message = await self.inflight.do(
+            key, lambda: self._request_completion(user_input, model, max_tokens)
+        )
+        
+        if not ai_response:
+            return fallback_message
+        
+        # Add AI response to conversation history
+        self.conversation_history.append({
+            "role": "model",
+            "parts": [{"text": ai_response}]
+        })
+        
+        # Limit history to last 10 messages
+        if len(self.conversation_history) > 10:
+            self.conversation_history = self.conversation_history[-10:]
+        
+        return ai_response
+    
+    async def _request_completion(self, user_input: str, model: str,
+                                  max_tokens: int) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Sends a generateContent request to the Gemini API
+        
+        Args:
+            user_input: Text spoken by the user
+            model: Gemini model to use
+            max_tokens: Output token limit
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.base_url,
+        Returns:
+            tuple: (AI response, None) on success or (None, fallback message)
+        """
+        try:
+            async with self.keys.acquire() as provider_key:
+                cached_content = await self._get_cached_content(provider_key, model)
+                url = f"{provider_key.endpoint}/models/{model}:generateContent"
+                
+                headers = {
+                    "Content-Type": "application/json"
+                }
+                
+                params = {
+                    "key": provider_key.api_key
+                }
+                
+                session = await self.http.get()
+                response = await session.post(
+                    url,
                     headers=headers,
                     params=params,
-                    json=payload,
+                    json=self._build_payload(user_input, max_tokens, cached_content),
                     timeout=aiohttp.ClientTimeout(total=30)
-                ) as response:
+                )
+                self.keys.record_response(provider_key, response.status, response.headers)
+                
+                if cached_content and response.status in (400, 403, 404):
+                    # Cache was evicted or rejected - retry once with the inline persona
+                    error_text = await response.text()
+                    response.release()
+                    logger.warning("Cached content rejected (%s), falling back: %s", response.status, error_text)
+                    self._invalidate_cached_content(provider_key, model)
+                    response = await session.post(
+                        url,
+                        headers=headers,
+                        params=params,
+                        json=self._build_payload(user_input, max_tokens, None),
+                        timeout=aiohttp.ClientTimeout(total=30)
+                    )
+                    self.keys.record_response(provider_key, response.status, response.headers)
+                
+                async with response:
                     
                     if response.status == 200:
                         result = await response.json()
@@ -106,41 +185,231 @@ class GeminiService:
                                 ai_response = parts[0].get("text", "").strip()
                                 
                                 if ai_response:
-                                    # Add AI response to conversation history
-                                    self.conversation_history.append({
-                                        "role": "model",
-                                        "parts": [{"text": ai_response}]
-                                    })
-                                    
-                                    # Limit history to last 10 messages
-                                    if len(self.conversation_history) > 10:
-                                        self.conversation_history = self.conversation_history[-10:]
-                                    
-                                    logger.info(f"Gemini response generated: {ai_response}")
-                                    return ai_response
+                                    logger.info("Gemini response generated: %s", ai_response, extra={"category": "transcript"})
+                                    return ai_response, None
                                 else:
                                     logger.warning("Empty response from Gemini")
-                                    return "Sorry, I can't respond right now."
+                                    return None, "Sorry, I can't respond right now."
                             else:
                                 logger.warning("No parts found in Gemini response")
-                                return "I'm experiencing a technical issue, please try again."
+                                return None, "I'm experiencing a technical issue, please try again."
                         else:
                             logger.warning("No candidates found in Gemini response")
-                            return "I couldn't generate a response, please try again."
+                            return None, "I couldn't generate a response, please try again."
                     else:
                         error_text = await response.text()
-                        logger.error(f"Gemini API error {response.status}: {error_text}")
-                        return "The service is currently unavailable, please try again later."
+                        logger.error("Gemini API error %s: %s", response.status, error_text)
+                        return None, "The service is currently unavailable, please try again later."
                         
-        except aiohttp.ClientTimeout:
+        except asyncio.TimeoutError:
             logger.error("Gemini API timeout")
-            return "The request timed out, please try again."
+            return None, "The request timed out, please try again."
         except aiohttp.ClientError as e:
-            logger.error(f"Gemini API client error: {str(e)}")
-            return "I'm having trouble connecting, please try again."
+            logger.error("Gemini API client error: %s", e)
+            return None, "I'm having trouble connecting, please try again."
         except Exception as e:
-            logger.error(f"Gemini generation error: {str(e)}")
-            return "An unexpected error occurred, please try again."
+            logger.error("Gemini generation error: %s", e)
+            return None, "An unexpected error occurred, please try again."
+    
+    def _build_payload(self, user_input: str, max_tokens: int, cached_content: Optional[str]) -> dict:
+        """
+        Builds the generateContent payload
+        
+        Args:
+            user_input: Text spoken by the user
+            max_tokens: Output token limit
+            cached_content: Name of the cached persona, or None to send it inline
+            
+        Returns:
+            dict: Request payload
+        """
+        payload = {
+            "contents": [
+                {
+                    "role": "user", 
+                    "parts": [{"text": user_input}]
+                }
+            ],
+            "generationConfig": {
+                "temperature": settings.GEMINI_TEMPERATURE,
+                "maxOutputTokens": max_tokens,
+                "topP": 0.8,
+                "topK": 40
+            },
+            "safetySettings": [
+                {
+                    "category": "HARM_CATEGORY_HARASSMENT",
+                    "threshold": "BLOCK_MEDIUM_AND_ABOVE"
+                },
+                {
+                    "category": "HARM_CATEGORY_HATE_SPEECH", 
+                    "threshold": "BLOCK_MEDIUM_AND_ABOVE"
+                },
+                {
+                    "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
+                    "threshold": "BLOCK_MEDIUM_AND_ABOVE"
+                },
+                {
+                    "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
+                    "threshold": "BLOCK_MEDIUM_AND_ABOVE"
+                }
+            ]
+        }
+        
+        if cached_content:
+            payload["cachedContent"] = cached_content
+        else:
+            payload["systemInstruction"] = {"parts": [{"text": self.system_prompt}]}
+        
+        return payload
+    
+    async def _get_cached_content(self, provider_key: ProviderKey, model: str) -> Optional[str]:
+        """
+        Returns the cached persona name for a key and model without waiting on the provider
+        
+        Creation and TTL refreshes run as background tasks, one per key and model;
+        until a cache exists the caller sends the persona inline.
+        
+        Args:
+            provider_key: API key the cache belongs to
+            model: Gemini model the cache belongs to
+            
+        Returns:
+            str: Cached content name (cachedContents/...) or None if no usable cache exists yet
+        """
+        if not settings.GEMINI_CONTEXT_CACHE_ENABLED or not self.cache_eligible:
+            return None
+        
+        cache_key = (provider_key.label, model)
+        name = self._fresh_cached_content(cache_key)
+        if name:
+            return name
+        
+        cache = self.context_caches.get(cache_key)
+        now = time.monotonic()
+        if now >= self.cache_disabled_until.get(cache_key, 0.0):
+            task = self._cache_tasks.get(cache_key)
+            if task is None or task.done():
+                self._cache_tasks[cache_key] = asyncio.create_task(
+                    self._maintain_cached_content(provider_key, model)
+                )
+        
+        # Inside the refresh margin the current cache is still valid until it expires
+        if cache and now < cache["expires_at"]:
+            return cache["name"]
+        return None
+    
+    async def _maintain_cached_content(self, provider_key: ProviderKey, model: str):
+        """
+        Refreshes the key's cache for a model, or creates it, backing off on failure
+        
+        Args:
+            provider_key: API key the cache belongs to
+            model: Gemini model the cache belongs to
+        """
+        cache_key = (provider_key.label, model)
+        lock = self._cache_locks.setdefault(cache_key, asyncio.Lock())
+        async with lock:
+            if self._fresh_cached_content(cache_key):
+                return
+            
+            cache = self.context_caches.get(cache_key)
+            if cache and time.monotonic() < cache["expires_at"]:
+                if await self._refresh_cached_content(provider_key, model):
+                    return
+            
+            if await self._create_cached_content(provider_key, model):
+                return
+            
+            self._invalidate_cached_content(provider_key, model)
+            self.cache_disabled_until[cache_key] = time.monotonic() + settings.GEMINI_CONTEXT_CACHE_RETRY_INTERVAL
+    
+    def _fresh_cached_content(self, cache_key: Tuple[str, str]) -> Optional[str]:
+        cache = self.context_caches.get(cache_key)
+        if cache and time.monotonic() < cache["expires_at"] - settings.GEMINI_CONTEXT_CACHE_REFRESH_MARGIN:
+            return cache["name"]
+        return None
+    
+    async def _create_cached_content(self, provider_key: ProviderKey, model: str) -> bool:
+        """
+        Creates a cachedContents resource holding the persona
+        
+        Args:
+            provider_key: API key to create the cache with
+            model: Gemini model the cache belongs to
+            
+        Returns:
+            bool: Whether the cache was created
+        """
+        payload = {
+            "model": f"models/{model}",
+            "displayName": "voice-agent-persona",
+            "systemInstruction": {"parts": [{"text": self.system_prompt}]},
+            "ttl": f"{settings.GEMINI_CONTEXT_CACHE_TTL}s"
+        }
+        
+        try:
+            session = await self.http.get()
+            async with session.post(
+                f"{provider_key.endpoint}/cachedContents",
+                params={"key": provider_key.api_key},
+                json=payload,
+                timeout=aiohttp.ClientTimeout(total=10)
+            ) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    name = result.get("name")
+                    if not name:
+                        return False
+                    self.context_caches[(provider_key.label, model)] = {
+                        "name": name,
+                        "expires_at": time.monotonic() + settings.GEMINI_CONTEXT_CACHE_TTL
+                    }
+                    logger.info("Gemini context cache created: %s", name)
+                    return True
+                else:
+                    error_text = await response.text()
+                    logger.warning("Gemini context cache unavailable %s: %s", response.status, error_text)
+                    return False
+        except Exception as e:
+            logger.warning("Gemini context cache creation error: %s", e)
+            return False
+    
+    async def _refresh_cached_content(self, provider_key: ProviderKey, model: str) -> bool:
+        """
+        Extends the TTL of the existing cache before it expires
+        
+        Args:
+            provider_key: API key the cache belongs to
+            model: Gemini model the cache belongs to
+            
+        Returns:
+            bool: Whether the TTL was extended
+        """
+        cache = self.context_caches[(provider_key.label, model)]
+        try:
+            session = await self.http.get()
+            async with session.patch(
+                f"{provider_key.endpoint}/{cache['name']}",
+                params={"key": provider_key.api_key, "updateMask": "ttl"},
+                json={"ttl": f"{settings.GEMINI_CONTEXT_CACHE_TTL}s"},
+                timeout=aiohttp.ClientTimeout(total=10)
+            ) as response:
+                if response.status == 200:
+                    cache["expires_at"] = time.monotonic() + settings.GEMINI_CONTEXT_CACHE_TTL
+                    logger.info("Gemini context cache refreshed: %s", cache['name'])
+                    return True
+                else:
+                    error_text = await response.text()
+                    logger.warning("Gemini context cache refresh failed %s: %s", response.status, error_text)
+                    return False
+        except Exception as e:
+            logger.warning("Gemini context cache refresh error: %s", e)
+            return False
+    
+    def _invalidate_cached_content(self, provider_key: ProviderKey, model: str):
+        """Forgets the key's cache for a model so the next request recreates it"""
+        self.context_caches.pop((provider_key.label, model), None)
     
     async def health_check(self) -> bool:
         """
@@ -150,28 +419,38 @@ class GeminiService:
             bool: Whether the API is reachable
         """
         try:
-            test_payload = {
-                "contents": [
-                    {
-                        "role": "user", 
-                        "parts": [{"text": "Test"}]
-                    }
-                ]
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.base_url,
-                    params={"key": self.api_key},
-                    json=test_payload,
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as response:
-                    return response.status == 200
+            return await self.keys.check_all(self._probe_key)
         except Exception as e:
-            logger.error(f"Gemini health check failed: {str(e)}")
+            logger.error("Gemini health check failed: %s", e)
             return False
     
+    async def _probe_key(self, key: ProviderKey) -> bool:
+        # Model metadata lookup is cheap and does not consume generation quota
+        session = await self.http.get()
+        async with session.get(
+            f"{key.endpoint}/models/{settings.GEMINI_MODEL}",
+            params={"key": key.api_key},
+            timeout=aiohttp.ClientTimeout(total=10)
+        ) as response:
+            self.keys.record_response(key, response.status, response.headers)
+            return response.status == 200
+    
     def clear_conversation_history(self):
         """Clears the conversation history"""
         self.conversation_history = []
         logger.info("Conversation history cleared")
+    
+    async def warmup(self) -> bool:
+        """
+        Pre-opens the pooled connection to the Gemini API
+        
+        Returns:
+            bool: Whether the API host was reachable
+        """
+        return await self.http.warmup()
+    
+    async def close(self):
+        """Stops pending cache maintenance and closes the pooled HTTP session"""
+        for task in self._cache_tasks.values():
+            task.cancel()
+        await self.http.close()
@@ -0,0 +1,84 @@
+"""
+Deep health checks for the provider services
+Runs all provider checks concurrently and caches the result for a short TTL
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class HealthService:
+    def __init__(self, checks: Dict[str, Callable[[], Awaitable[bool]]]):
+        self.checks = checks
+        self.timeout = settings.HEALTH_CHECK_TIMEOUT
+        self.cache_ttl = settings.HEALTH_CACHE_TTL
+        self._cached_result: Optional[dict] = None
+        self._cached_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def check(self) -> dict:
+        """
+        Returns provider health, served from cache while it is fresh
+
+        Returns:
+            dict: Overall status and per-provider results
+        """
+        if self._is_fresh():
+            return {**self._cached_result, "cached": True}
+
+        # Only one caller refreshes; concurrent probes wait for its result
+        async with self._lock:
+            if self._is_fresh():
+                return {**self._cached_result, "cached": True}
+
+            result = await self._run_checks()
+            self._cached_result = result
+            self._cached_at = time.monotonic()
+            return {**result, "cached": False}
+
+    def _is_fresh(self) -> bool:
+        return (
+            self._cached_result is not None
+            and time.monotonic() - self._cached_at < self.cache_ttl
+        )
+
+    async def _run_checks(self) -> dict:
+        names = list(self.checks.keys())
+        results = await asyncio.gather(
+            *(self._run_single(name, self.checks[name]) for name in names)
+        )
+        services = dict(zip(names, results))
+        healthy = all(service["healthy"] for service in services.values())
+
+        return {
+            "status": "healthy" if healthy else "degraded",
+            "services": services,
+            "checked_at": time.time()
+        }
+
+    async def _run_single(self, name: str, check: Callable[[], Awaitable[bool]]) -> dict:
+        started = time.perf_counter()
+        try:
+            healthy = await asyncio.wait_for(check(), timeout=self.timeout)
+            error = None if healthy else "check failed"
+        except asyncio.TimeoutError:
+            healthy = False
+            error = "timeout"
+        except Exception as e:
+            healthy = False
+            error = str(e)
+
+        latency_ms = round((time.perf_counter() - started) * 1000, 1)
+        if not healthy:
+            logger.warning("Health check failed for %s: %s", name, error)
+
+        return {
+            "healthy": bool(healthy),
+            "latency_ms": latency_ms,
+            "error": error
+        }
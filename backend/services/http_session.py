@@ -0,0 +1,71 @@
+"""
+Shared HTTP session management for provider services
+Keeps one pooled aiohttp session per provider so connections, DNS lookups
+and TLS handshakes are reused across requests
+"""
+
+import asyncio
+import logging
+from typing import Optional
+import aiohttp
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class PooledSession:
+    def __init__(self, name: str, warmup_url: str):
+        self.name = name
+        self.warmup_url = warmup_url
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> aiohttp.ClientSession:
+        """
+        Returns the shared session, creating it on first use
+
+        Returns:
+            aiohttp.ClientSession: Pooled client session
+        """
+        if self._session is not None and not self._session.closed:
+            return self._session
+
+        async with self._lock:
+            if self._session is None or self._session.closed:
+                connector = aiohttp.TCPConnector(
+                    limit=settings.HTTP_POOL_SIZE,
+                    ttl_dns_cache=settings.HTTP_DNS_CACHE_TTL,
+                    keepalive_timeout=settings.HTTP_KEEPALIVE_TIMEOUT
+                )
+                self._session = aiohttp.ClientSession(connector=connector)
+                logger.info("HTTP session created for %s", self.name)
+
+        return self._session
+
+    async def warmup(self) -> bool:
+        """
+        Opens a connection to the provider so DNS and TLS are ready
+        before the first real request
+
+        Returns:
+            bool: Whether the provider host was reachable
+        """
+        try:
+            session = await self.get()
+            async with session.head(
+                self.warmup_url,
+                timeout=aiohttp.ClientTimeout(total=settings.WARMUP_TIMEOUT)
+            ) as response:
+                # Any HTTP status means the connection is established and pooled
+                logger.info("%s connection warmed up (status %s)", self.name, response.status)
+                return True
+        except Exception as e:
+            logger.warning("%s warmup failed: %s", self.name, e)
+            return False
+
+    async def close(self):
+        """Closes the shared session"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("HTTP session closed for %s", self.name)
+        self._session = None
@@ -0,0 +1,216 @@
+"""
+Provider credential pools
+Spreads requests for one provider across several API keys / endpoints,
+routing each call to the least-loaded key that is not cooling down after a
+429, an exhausted rate-limit window or a failed connection
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, List, Mapping, Optional
+
+import aiohttp
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Headers providers use to report the remaining quota and when it resets
+RATE_LIMIT_REMAINING_HEADERS = ("x-ratelimit-remaining-requests", "x-ratelimit-remaining", "ratelimit-remaining")
+RATE_LIMIT_RESET_HEADERS = ("x-ratelimit-reset-requests", "x-ratelimit-reset", "ratelimit-reset")
+
+class ProviderKey:
+    def __init__(self, label: str, api_key: str, endpoint: str):
+        self.label = label
+        self.api_key = api_key
+        self.endpoint = endpoint.rstrip("/")
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+        self.failures = 0
+        self.cooldown_until = 0.0
+
+    @property
+    def cooling_down(self) -> bool:
+        return time.monotonic() < self.cooldown_until
+
+    def to_dict(self) -> dict:
+        # The key itself is never exposed, only its label
+        return {
+            "label": self.label,
+            "endpoint": self.endpoint,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "failures": self.failures,
+            "cooldown_remaining": round(max(0.0, self.cooldown_until - time.monotonic()), 1)
+        }
+
+class KeyPool:
+    def __init__(self, name: str, keys: List[ProviderKey]):
+        if not keys:
+            raise ValueError(f"{name} key pool needs at least one key")
+        self.name = name
+        self.keys = keys
+
+    @classmethod
+    def from_settings(cls, name: str, primary_key: str, extra_keys: str,
+                      endpoints: str, default_endpoint: str) -> "KeyPool":
+        """
+        Builds a pool from the single-key setting plus comma-separated extras
+
+        Args:
+            name: Provider name used in labels and logs
+            primary_key: The provider's *_API_KEY setting
+            extra_keys: Comma-separated additional keys
+            endpoints: Comma-separated API roots, one per key, or one for all keys
+            default_endpoint: API root used when no endpoints are configured
+
+        Returns:
+            KeyPool: Pool with one entry per distinct key
+        """
+        api_keys = []
+        for api_key in [primary_key] + extra_keys.split(","):
+            api_key = api_key.strip()
+            if api_key and api_key not in api_keys:
+                api_keys.append(api_key)
+        if not api_keys:
+            api_keys = [""]  # Unconfigured; requests fail upstream as before
+
+        roots = [root.strip() for root in endpoints.split(",") if root.strip()] or [default_endpoint]
+        if len(roots) not in (1, len(api_keys)):
+            raise ValueError(f"{name} endpoints must be a single URL or one per key ({len(api_keys)})")
+
+        return cls(name, [
+            ProviderKey(f"{name.lower()}-{index + 1}", api_key, roots[index % len(roots)])
+            for index, api_key in enumerate(api_keys)
+        ])
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def select(self) -> ProviderKey:
+        """
+        Picks the healthy key with the fewest in-flight requests
+
+        When every key is cooling down, the one that recovers first is used.
+
+        Returns:
+            ProviderKey: Key to send the next request with
+        """
+        healthy = [key for key in self.keys if not key.cooling_down]
+        if not healthy:
+            return min(self.keys, key=lambda key: key.cooldown_until)
+        return min(healthy, key=lambda key: (key.in_flight, key.requests))
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[ProviderKey]:
+        """
+        Holds the least-loaded healthy key for one request so its load is counted
+
+        Connection errors and timeouts raised inside the block cool the key
+        down; callers report HTTP responses through record_response.
+        """
+        key = self.select()
+        key.in_flight += 1
+        key.requests += 1
+        try:
+            yield key
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            self.record_failure(key, f"request failed ({type(e).__name__})")
+            raise
+        finally:
+            key.in_flight -= 1
+
+    def record_response(self, key: ProviderKey, status: int, headers: Mapping[str, str]):
+        """
+        Cools a key down when the provider throttled it or its quota is spent
+
+        Args:
+            key: Key the request was sent with
+            status: HTTP status code
+            headers: Response headers
+        """
+        if status == 429:
+            retry_after = self._seconds(headers.get("retry-after"))
+            cooldown = settings.KEY_POOL_COOLDOWN if retry_after is None else retry_after
+            key.throttled += 1
+            self._cool_down(key, cooldown, f"throttled ({status})")
+            return
+
+        remaining = self._header(headers, RATE_LIMIT_REMAINING_HEADERS)
+        if remaining is not None and remaining <= 0:
+            reset = self._header(headers, RATE_LIMIT_RESET_HEADERS)
+            cooldown = settings.KEY_POOL_COOLDOWN if reset is None else reset
+            self._cool_down(key, cooldown, "rate-limit window exhausted")
+
+    def record_failure(self, key: ProviderKey, reason: str):
+        """
+        Cools a key down after a connection error, timeout or failed health check
+
+        Args:
+            key: Key the request was sent with
+            reason: Short description for the log
+        """
+        key.failures += 1
+        self._cool_down(key, settings.KEY_POOL_COOLDOWN, reason)
+
+    async def check_all(self, probe: Callable[[ProviderKey], Awaitable[bool]]) -> bool:
+        """
+        Health-checks every key concurrently, cooling down the ones that fail
+
+        Cooled-down keys are skipped by select() until they recover, so live
+        requests avoid a key the health check found broken.
+
+        Args:
+            probe: Coroutine function returning whether one key is healthy (may raise)
+
+        Returns:
+            bool: Whether at least one key is healthy
+        """
+        results = await asyncio.gather(*(probe(key) for key in self.keys), return_exceptions=True)
+        for key, result in zip(self.keys, results):
+            if isinstance(result, BaseException):
+                self.record_failure(key, f"health check failed ({type(result).__name__}: {result})")
+            elif not result and not key.cooling_down:
+                self.record_failure(key, "health check failed")
+        return any(result is True for result in results)
+
+    def stats(self) -> dict:
+        """
+        Returns per-key load and throttling figures
+
+        Returns:
+            dict: Healthy key count and per-key state
+        """
+        return {
+            "healthy": sum(1 for key in self.keys if not key.cooling_down),
+            "keys": [key.to_dict() for key in self.keys]
+        }
+
+    def _cool_down(self, key: ProviderKey, seconds: float, reason: str):
+        seconds = min(seconds, settings.KEY_POOL_MAX_COOLDOWN)
+        key.cooldown_until = max(key.cooldown_until, time.monotonic() + seconds)
+        logger.warning("%s %s, cooling down for %.1fs", key.label, reason, seconds)
+
+    def _header(self, headers: Mapping[str, str], names) -> Optional[float]:
+        for name in names:
+            value = self._seconds(headers.get(name))
+            if value is not None:
+                return value
+        return None
+
+    @staticmethod
+    def _seconds(value: Optional[str]) -> Optional[float]:
+        """Parses "12", "12.5" or "12s"; absolute epoch timestamps become a delay"""
+        if value is None:
+            return None
+        try:
+            seconds = float(value.strip().rstrip("s"))
+        except ValueError:
+            return None  # e.g. an HTTP-date Retry-After; the default cooldown applies
+        if seconds > 1e9:
+            seconds -= time.time()
+        return max(0.0, seconds)
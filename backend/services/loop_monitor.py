@@ -0,0 +1,153 @@
+"""
+Event loop lag monitoring
+Samples scheduling delay into a histogram and logs the loop thread's stack
+whenever a callback blocks the loop for too long
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in milliseconds
+LAG_BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+class LoopLagMonitor:
+    def __init__(self, interval: float, slow_threshold: float):
+        self.interval = interval
+        self.slow_threshold = slow_threshold
+        self.bucket_counts: List[int] = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.samples = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    async def start(self):
+        """Starts the lag sampler on the running loop and the stall watchdog thread"""
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._sample())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info("Event loop lag monitor started")
+
+    async def stop(self):
+        """Stops sampling"""
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _sample(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self._record(max(0.0, loop.time() - expected))
+            self._heartbeat = time.monotonic()
+
+    def _record(self, lag: float):
+        lag_ms = lag * 1000
+        for index, bound in enumerate(LAG_BUCKETS_MS):
+            if lag_ms <= bound:
+                self.bucket_counts[index] += 1
+                break
+        else:
+            self.bucket_counts[-1] += 1
+
+        self.samples += 1
+        self.total_lag += lag
+        self.max_lag = max(self.max_lag, lag)
+
+    def _watch(self):
+        # Runs in its own thread so it can observe the loop while it is blocked
+        reported_heartbeat = None
+        check_every = max(self.slow_threshold / 2, 0.01)
+
+        while not self._stopped.wait(check_every):
+            heartbeat = self._heartbeat
+            blocked_for = time.monotonic() - heartbeat - self.interval
+            if blocked_for < self.slow_threshold or heartbeat == reported_heartbeat:
+                continue
+
+            # Report each stall once, with the stack of the code holding the loop
+            reported_heartbeat = heartbeat
+            self.stalls += 1
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame, limit=20)) if frame else "<no frame>"
+            logger.warning("Event loop blocked for at least %.0fms:\n%s", blocked_for * 1000, stack)
+
+    def stats(self) -> dict:
+        """
+        Returns the lag histogram and summary figures
+
+        Returns:
+            dict: Sample count, mean/max lag, stall count and bucket counts
+        """
+        labels = [f"le_{bound}ms" for bound in LAG_BUCKETS_MS] + ["inf"]
+        return {
+            "samples": self.samples,
+            "mean_lag_ms": round(self.total_lag / self.samples * 1000, 2) if self.samples else 0.0,
+            "max_lag_ms": round(self.max_lag * 1000, 2),
+            "stalls": self.stalls,
+            "histogram": dict(zip(labels, self.bucket_counts))
+        }
+
+class SamplingProfiler:
+    def __init__(self):
+        self._lock = asyncio.Lock()
+
+    @property
+    def busy(self) -> bool:
+        return self._lock.locked()
+
+    async def profile(self, seconds: float, interval: float) -> str:
+        """
+        Samples every thread's stack for a bounded time without blocking the loop
+
+        Args:
+            seconds: How long to sample
+            interval: Time between samples
+
+        Returns:
+            str: Collapsed stacks ("frame;frame;frame count" per line), flamegraph-compatible
+        """
+        async with self._lock:
+            return await asyncio.to_thread(self._collect, seconds, interval)
+
+    def _collect(self, seconds: float, interval: float) -> str:
+        own_thread = threading.get_ident()
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        counts = {}
+        deadline = time.monotonic() + seconds
+
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(thread_names.get(thread_id, f"thread-{thread_id}"))
+                key = ";".join(reversed(stack))
+                counts[key] = counts.get(key, 0) + 1
+            time.sleep(interval)
+
+        return "\n".join(f"{stack} {count}" for stack, count in sorted(counts.items())) + "\n"
@@ -0,0 +1,216 @@
+"""
+Load-adaptive quality tiers
+Steps sessions down to faster, cheaper models under pressure and back up on recovery
+"""
+
+import logging
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class QualityTier:
+    def __init__(self, name: str, deepgram_model: str, gemini_model: str,
+                 gemini_max_tokens: int, elevenlabs_model: str):
+        self.name = name
+        self.deepgram_model = deepgram_model
+        self.gemini_model = gemini_model
+        self.gemini_max_tokens = gemini_max_tokens
+        self.elevenlabs_model = elevenlabs_model
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "deepgram_model": self.deepgram_model,
+            "gemini_model": self.gemini_model,
+            "gemini_max_tokens": self.gemini_max_tokens,
+            "elevenlabs_model": self.elevenlabs_model
+        }
+
+def default_tiers() -> List[QualityTier]:
+    """
+    Builds the tier ladder from settings, best quality first
+
+    Returns:
+        list: Quality tiers ordered from highest to fastest
+    """
+    return [
+        QualityTier(
+            "high",
+            settings.DEEPGRAM_MODEL,
+            settings.GEMINI_MODEL,
+            settings.GEMINI_MAX_TOKENS,
+            settings.ELEVENLABS_MODEL
+        ),
+        QualityTier(
+            "balanced",
+            settings.DEEPGRAM_MODEL,
+            settings.GEMINI_MODEL,
+            min(settings.GEMINI_MAX_TOKENS, settings.QUALITY_BALANCED_MAX_TOKENS),
+            settings.QUALITY_BALANCED_TTS_MODEL
+        ),
+        QualityTier(
+            "fast",
+            settings.DEEPGRAM_MODEL,
+            settings.QUALITY_FAST_GEMINI_MODEL,
+            min(settings.GEMINI_MAX_TOKENS, settings.QUALITY_FAST_MAX_TOKENS),
+            settings.QUALITY_FAST_TTS_MODEL
+        )
+    ]
+
+class QualityPolicy:
+    def __init__(self, queue_depth: Callable[[], int], tiers: Optional[List[QualityTier]] = None):
+        self.queue_depth = queue_depth
+        self.tiers = tiers or default_tiers()
+        self.level = 0
+        self.tier_changes = 0
+        self.overrides: Dict[str, str] = {}
+        self.stage_targets = {
+            "stt": settings.QUALITY_STT_TARGET,
+            "llm": settings.QUALITY_LLM_TARGET,
+            "tts": settings.QUALITY_TTS_TARGET
+        }
+        self._latencies: Dict[str, Deque[Tuple[float, float]]] = {
+            stage: deque(maxlen=200) for stage in self.stage_targets
+        }
+        self._outcomes: Deque[Tuple[float, bool]] = deque(maxlen=200)
+        self._last_change = time.monotonic()
+
+    @property
+    def current_tier(self) -> QualityTier:
+        return self.tiers[self.level]
+
+    def tier_for(self, client_id: Optional[str] = None) -> QualityTier:
+        """
+        Returns the tier a session should use for its next turn
+
+        Args:
+            client_id: Session identifier (overrides take precedence)
+
+        Returns:
+            QualityTier: Tier to use
+        """
+        override = self.overrides.get(client_id) if client_id else None
+        if override:
+            return self._tier_by_name(override)
+
+        self.evaluate()
+        return self.current_tier
+
+    def set_override(self, client_id: str, tier_name: Optional[str]):
+        """
+        Pins a session to a tier, or returns it to automatic selection
+
+        Args:
+            client_id: Session identifier
+            tier_name: Tier name, or None/"auto" to clear the override
+        """
+        if not tier_name or tier_name == "auto":
+            self.overrides.pop(client_id, None)
+            return
+
+        self._tier_by_name(tier_name)  # validates the name
+        self.overrides[client_id] = tier_name
+
+    def clear_override(self, client_id: str):
+        self.overrides.pop(client_id, None)
+
+    def record_latency(self, stage: str, seconds: float):
+        """Records how long a pipeline stage took"""
+        if stage in self._latencies:
+            self._latencies[stage].append((time.monotonic(), seconds))
+
+    def record_outcome(self, success: bool):
+        """Records whether a turn completed without provider errors"""
+        self._outcomes.append((time.monotonic(), success))
+
+    def predicted_latency(self, stages: List[str]) -> float:
+        """
+        Predicts how long the given stages will take from recent medians
+
+        Stages without recent samples count at their latency target.
+
+        Args:
+            stages: Stage names, e.g. ["llm", "tts"]
+
+        Returns:
+            float: Predicted seconds
+        """
+        predicted = 0.0
+        for stage in stages:
+            recent = self._recent(self._latencies[stage])
+            predicted += self._percentile(recent, 0.5) if recent else self.stage_targets[stage]
+        return predicted
+
+    def pressure(self) -> float:
+        """
+        Combines queue depth, stage latency and error rate into one load figure
+
+        Returns:
+            float: 1.0 or more means overloaded, low values mean idle
+        """
+        signals = [self.queue_depth() / settings.QUALITY_QUEUE_DEPTH_HIGH]
+
+        for stage, target in self.stage_targets.items():
+            recent = self._recent(self._latencies[stage])
+            if recent:
+                signals.append(self._percentile(recent, 0.9) / target)
+
+        outcomes = self._recent(self._outcomes)
+        if len(outcomes) >= settings.QUALITY_MIN_SAMPLES:
+            error_rate = outcomes.count(False) / len(outcomes)
+            signals.append(error_rate / settings.QUALITY_ERROR_RATE_HIGH)
+
+        return max(signals)
+
+    def evaluate(self):
+        """Steps the global tier down or up, with hysteresis"""
+        now = time.monotonic()
+        if now - self._last_change < settings.QUALITY_MIN_DWELL:
+            return
+
+        pressure = self.pressure()
+        if pressure >= 1.0 and self.level < len(self.tiers) - 1:
+            self._change_level(self.level + 1, pressure, now)
+        elif pressure <= settings.QUALITY_RECOVERY_RATIO and self.level > 0:
+            self._change_level(self.level - 1, pressure, now)
+
+    def stats(self) -> dict:
+        """
+        Returns policy state for metrics
+
+        Returns:
+            dict: Current tier, pressure, change count and overrides
+        """
+        return {
+            "tier": self.current_tier.name,
+            "pressure": round(self.pressure(), 3),
+            "tier_changes": self.tier_changes,
+            "overrides": dict(self.overrides)
+        }
+
+    def _change_level(self, level: int, pressure: float, now: float):
+        previous = self.current_tier.name
+        self.level = level
+        self.tier_changes += 1
+        self._last_change = now
+        logger.warning("Quality tier changed: %s -> %s (pressure %.2f)", previous, self.current_tier.name, pressure)
+
+    def _tier_by_name(self, name: str) -> QualityTier:
+        for tier in self.tiers:
+            if tier.name == name:
+                return tier
+        raise ValueError(f"Unknown quality tier: {name}")
+
+    def _recent(self, samples) -> list:
+        cutoff = time.monotonic() - settings.QUALITY_WINDOW
+        return [value for timestamp, value in samples if timestamp >= cutoff]
+
+    @staticmethod
+    def _percentile(values: list, fraction: float) -> float:
+        ordered = sorted(values)
+        index = min(len(ordered) - 1, int(len(ordered) * fraction))
+        return ordered[index]
@@ -0,0 +1,109 @@
+"""
+Per-session memory accounting
+Charges the audio a turn holds in memory (inbound, decoded PCM, outbound)
+to its session and rejects turns that would push a session, or the process
+as a whole, past its cap
+"""
+
+import logging
+from typing import Dict
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ("inbound", "pcm", "outbound")
+
+class SessionMemoryLimitExceeded(Exception):
+    """Raised when a turn would exceed the session or process memory cap"""
+
+def format_bytes(size: int) -> str:
+    return f"{size / (1024 * 1024):.1f} MB"
+
+class SessionMemory:
+    def __init__(self, client_id: str, manager: "SessionMemoryManager"):
+        self.client_id = client_id
+        self.manager = manager
+        self.usage: Dict[str, int] = {category: 0 for category in CATEGORIES}
+        self.peak = 0
+
+    @property
+    def total(self) -> int:
+        return sum(self.usage.values())
+
+    def charge(self, category: str, size: int):
+        """
+        Accounts for memory held by the current turn
+
+        Args:
+            category: One of CATEGORIES
+            size: Bytes held
+
+        Raises:
+            SessionMemoryLimitExceeded: If the session or process cap would be exceeded
+        """
+        if self.total + size > self.manager.session_limit:
+            self.manager.rejections += 1
+            raise SessionMemoryLimitExceeded(
+                f"Session memory limit reached: {category} audio needs {format_bytes(size)}, "
+                f"{format_bytes(self.total)} of {format_bytes(self.manager.session_limit)} already in use. "
+                f"Please send a shorter recording."
+            )
+        if self.manager.total + size > self.manager.total_limit:
+            self.manager.rejections += 1
+            raise SessionMemoryLimitExceeded(
+                "Server is at its audio memory limit, please try again in a moment."
+            )
+
+        self.usage[category] += size
+        self.manager.total += size
+        self.peak = max(self.peak, self.total)
+
+    def end_turn(self):
+        """Releases everything the turn charged"""
+        self.manager.total -= self.total
+        self.usage = {category: 0 for category in CATEGORIES}
+
+class SessionMemoryManager:
+    def __init__(self, session_limit: int, total_limit: int):
+        self.session_limit = session_limit
+        self.total_limit = total_limit
+        self.total = 0
+        self.rejections = 0
+        self._sessions: Dict[str, SessionMemory] = {}
+
+    def session(self, client_id: str) -> SessionMemory:
+        """Returns the session's accounting, creating it on first use"""
+        memory = self._sessions.get(client_id)
+        if memory is None:
+            memory = self._sessions[client_id] = SessionMemory(client_id, self)
+        return memory
+
+    def close(self, client_id: str):
+        """Drops a disconnected session, releasing anything it still held"""
+        memory = self._sessions.pop(client_id, None)
+        if memory is not None:
+            memory.end_turn()
+
+    def stats(self) -> dict:
+        """
+        Returns process-wide usage and the largest sessions
+
+        Returns:
+            dict: Totals, limits, rejection count and per-category usage
+        """
+        by_category = {category: 0 for category in CATEGORIES}
+        for memory in self._sessions.values():
+            for category, size in memory.usage.items():
+                by_category[category] += size
+        return {
+            "sessions": len(self._sessions),
+            "bytes_in_use": self.total,
+            "session_limit": self.session_limit,
+            "total_limit": self.total_limit,
+            "by_category": by_category,
+            "max_session_peak": max((memory.peak for memory in self._sessions.values()), default=0),
+            "rejections": self.rejections
+        }
+
+session_memory = SessionMemoryManager(settings.SESSION_MEMORY_LIMIT, settings.TOTAL_SESSION_MEMORY_LIMIT)
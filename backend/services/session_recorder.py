@@ -0,0 +1,117 @@
+"""
+Session recording for offline latency analysis
+Appends each turn's input audio, texts, sizes and stage timings to a compact
+per-session file that tools/replay.py can feed back through the pipeline
+
+File format (.vrec): a sequence of records, each
+    <uint32 meta length><uint32 blob length><meta JSON (UTF-8)><blob>
+little-endian. The first record is a "session" header; every following
+record is a "turn" whose blob is the decoded input audio (may be empty).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import struct
+import time
+from typing import Dict, Iterator
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+RECORD_HEADER = struct.Struct('<II')
+FORMAT_VERSION = 1
+
+class SessionRecorder:
+    def __init__(self, directory: str, enabled: bool):
+        self.directory = directory
+        self.enabled = enabled
+        self._paths: Dict[str, str] = {}
+        self._turn_ids: Dict[str, int] = {}
+
+    def next_turn_id(self, client_id: str) -> int:
+        """Returns a per-session, increasing turn number"""
+        turn_id = self._turn_ids.get(client_id, 0) + 1
+        self._turn_ids[client_id] = turn_id
+        return turn_id
+
+    async def record_turn(self, client_id: str, turn: dict, audio: bytes = b""):
+        """
+        Appends one turn to the client's session file
+
+        Args:
+            client_id: Session identifier
+            turn: Turn metadata (texts, sizes, timings)
+            audio: Decoded input audio
+        """
+        if not self.enabled:
+            return
+
+        try:
+            path = self._paths.get(client_id)
+            records = []
+            if path is None:
+                path = self._new_path(client_id)
+                self._paths[client_id] = path
+                records.append(self._encode({
+                    "type": "session",
+                    "version": FORMAT_VERSION,
+                    "client_id": client_id,
+                    "started_at": time.time()
+                }))
+            records.append(self._encode({"type": "turn", **turn}, audio))
+
+            # File I/O stays off the event loop
+            await asyncio.to_thread(self._append, path, b"".join(records))
+        except Exception as e:
+            logger.error("Session recording error for %s: %s", client_id, e)
+
+    def close_session(self, client_id: str):
+        """Forgets the client's file; a reconnect starts a new recording"""
+        self._paths.pop(client_id, None)
+        self._turn_ids.pop(client_id, None)
+
+    def _new_path(self, client_id: str) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        safe_id = re.sub(r'[^A-Za-z0-9_.-]', '_', client_id)[:64]
+        return os.path.join(self.directory, f"{safe_id}-{int(time.time() * 1000)}.vrec")
+
+    @staticmethod
+    def _encode(meta: dict, blob: bytes = b"") -> bytes:
+        meta_bytes = json.dumps(meta, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        return RECORD_HEADER.pack(len(meta_bytes), len(blob)) + meta_bytes + bytes(blob)
+
+    @staticmethod
+    def _append(path: str, data: bytes):
+        with open(path, 'ab') as recording:
+            recording.write(data)
+
+def read_recording(path: str) -> Iterator[dict]:
+    """
+    Reads records from a .vrec file
+
+    Args:
+        path: Recording file path
+
+    Yields:
+        dict: Record metadata, with the blob under "audio" for turn records
+    """
+    with open(path, 'rb') as recording:
+        while True:
+            header = recording.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return  # End of file (or a torn final write)
+            meta_size, blob_size = RECORD_HEADER.unpack(header)
+            meta_bytes = recording.read(meta_size)
+            blob = recording.read(blob_size)
+            if len(meta_bytes) < meta_size or len(blob) < blob_size:
+                return
+            record = json.loads(meta_bytes.decode('utf-8'))
+            if record.get("type") == "turn":
+                record["audio"] = blob
+            yield record
+
+session_recorder = SessionRecorder(settings.SESSION_RECORDING_DIR, settings.SESSION_RECORDING_ENABLED)
@@ -0,0 +1,64 @@
+"""
+Request coalescing for identical in-flight upstream calls
+Concurrent callers with the same key share a single upstream task
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.upstream_calls = 0
+        self.coalesced_calls = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Runs func once per key among concurrent callers
+
+        Args:
+            key: Identity of the request (same key = same upstream result)
+            func: Coroutine factory performing the upstream call
+
+        Returns:
+            Any: Result of the shared upstream call
+        """
+        task = self._inflight.get(key)
+
+        if task is None:
+            self.upstream_calls += 1
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda finished: self._forget(key, finished))
+        else:
+            self.coalesced_calls += 1
+            logger.info("%s: coalesced identical in-flight request", self.name)
+
+        # Shield so that one cancelled waiter does not cancel the shared call
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+        # Retrieve the exception so it is not reported as unhandled
+        # when every waiter has already gone away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        """
+        Returns coalescing counters
+
+        Returns:
+            dict: Upstream, coalesced and currently in-flight counts
+        """
+        return {
+            "upstream_calls": self.upstream_calls,
+            "coalesced_calls": self.coalesced_calls,
+            "in_flight": len(self._inflight)
+        }
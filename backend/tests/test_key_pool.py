@@ -0,0 +1,139 @@
+"""
+Key pool tests against the local provider stub from tools/bench_key_pool.py
+
+Run from the backend directory:
+    python -m pytest tests
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from services.elevenlabs_service import ElevenLabsService
+from services.key_pool import KeyPool
+from tools.bench_key_pool import StubProvider
+
+LIMIT = 4  # concurrent requests the stub allows per key
+LATENCY = 0.05  # seconds per stub response
+KEYS = 3
+
+@pytest_asyncio.fixture
+async def stub():
+    provider = StubProvider(LIMIT, LATENCY)
+    app = web.Application()
+    app.router.add_post("/v1/text-to-speech/{voice_id}", provider.synthesize)
+    app.router.add_get("/v1/user", user)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    provider.endpoint = f"http://127.0.0.1:{port}/v1"
+    yield provider
+    await runner.cleanup()
+
+async def user(request: web.Request) -> web.Response:
+    # The stub treats "stub-key-2" as revoked
+    if request.headers.get("xi-api-key") == "stub-key-2":
+        return web.json_response({"detail": "invalid_api_key"}, status=401)
+    return web.json_response({"subscription": {}})
+
+def pooled_service(monkeypatch, endpoint: str, keys: int) -> ElevenLabsService:
+    monkeypatch.setattr(settings, "ELEVENLABS_API_KEY", "stub-key-1")
+    monkeypatch.setattr(settings, "ELEVENLABS_API_KEYS",
+                        ",".join(f"stub-key-{index}" for index in range(2, keys + 1)))
+    monkeypatch.setattr(settings, "ELEVENLABS_ENDPOINTS", endpoint)
+    return ElevenLabsService()
+
+async def drive(service: ElevenLabsService, requests: int, concurrency: int) -> float:
+    """Completes every request, retrying throttled ones; returns elapsed seconds"""
+    # Distinct texts so request coalescing does not merge them
+    queue = asyncio.Queue()
+    for index in range(requests):
+        queue.put_nowait(f"request {index}")
+
+    async def worker():
+        while not queue.empty():
+            text = queue.get_nowait()
+            if not await service.text_to_speech(text):
+                queue.put_nowait(text)
+                await asyncio.sleep(0.01)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - started
+
+@pytest.mark.asyncio
+async def test_pool_throughput_exceeds_single_key_ceiling(stub, monkeypatch):
+    service = pooled_service(monkeypatch, stub.endpoint, KEYS)
+    requests = 240
+    try:
+        elapsed = await drive(service, requests, KEYS * LIMIT)
+    finally:
+        await service.close()
+
+    single_key_ceiling = LIMIT / LATENCY
+    assert stub.served == requests
+    assert requests / elapsed > single_key_ceiling
+    assert all(key["requests"] > 0 for key in service.keys.stats()["keys"])
+
+@pytest.mark.asyncio
+async def test_throttled_keys_cool_down(stub, monkeypatch):
+    service = pooled_service(monkeypatch, stub.endpoint, KEYS)
+    try:
+        # Offer more concurrency than the pool can serve so the stub throttles
+        await drive(service, 120, KEYS * LIMIT * 2)
+    finally:
+        await service.close()
+
+    assert stub.throttled > 0
+    throttled = [key for key in service.keys.keys if key.throttled]
+    assert throttled
+    assert sum(key.throttled for key in throttled) == stub.throttled
+    for key in throttled:
+        assert key.cooldown_until > 0
+
+def test_select_skips_cooling_key():
+    pool = KeyPool.from_settings("Test", "key-a", "key-b", "", "http://127.0.0.1/v1")
+    first, second = pool.keys
+
+    pool.record_response(first, 429, {"retry-after": "30"})
+
+    assert first.cooling_down
+    assert pool.select() is second
+    assert pool.stats()["healthy"] == 1
+
+@pytest.mark.asyncio
+async def test_health_check_probes_every_key(stub, monkeypatch):
+    service = pooled_service(monkeypatch, stub.endpoint, KEYS)
+    try:
+        assert await service.health_check()
+    finally:
+        await service.close()
+
+    revoked = service.keys.keys[1]
+    assert revoked.failures == 1 and revoked.cooling_down
+    assert all(not key.cooling_down for key in service.keys.keys if key is not revoked)
+
+@pytest.mark.asyncio
+async def test_connection_errors_cool_the_key_down(stub, monkeypatch):
+    # Second key points at a closed port
+    endpoints = f"{stub.endpoint},http://127.0.0.1:9/v1"
+    service = pooled_service(monkeypatch, endpoints, 2)
+    try:
+        unreachable = service.keys.keys[1]
+        await drive(service, 20, 2)
+        assert await service.health_check()
+    finally:
+        await service.close()
+
+    assert unreachable.failures >= 1 and unreachable.cooling_down
+    assert stub.served == 20
@@ -0,0 +1,95 @@
+"""
+Allocation benchmark for the audio ingest path
+Compares peak traced memory per turn for the legacy copy-heavy path and the
+pooled/memoryview path, from base64 text to the STT request body
+
+Usage (from the backend directory):
+    python tools/bench_ingest.py [--seconds 10] [--turns 5]
+"""
+
+import argparse
+import asyncio
+import base64
+import io
+import math
+import os
+import struct
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydub import AudioSegment
+
+from services.audio_buffers import buffer_pool, decode_base64_into
+from services.deepgram_service import DeepgramService
+
+def make_wav(seconds: float, sample_rate: int = 48000, channels: int = 2) -> bytes:
+    """Builds a stereo 16-bit sine-wave WAV clip like a browser recording"""
+    frames = int(seconds * sample_rate)
+    samples = bytearray()
+    for index in range(frames):
+        value = int(8000 * math.sin(2 * math.pi * 440 * index / sample_rate))
+        samples += struct.pack('<h', value) * channels
+
+    segment = AudioSegment(
+        data=bytes(samples),
+        sample_width=2,
+        frame_rate=sample_rate,
+        channels=channels
+    )
+    output = io.BytesIO()
+    segment.export(output, format="wav")
+    return output.getvalue()
+
+async def legacy_turn(encoded: str) -> int:
+    """Mirrors the previous ingest path: decode, BytesIO, convert, export, getvalue"""
+    audio_bytes = base64.b64decode(encoded)
+    segment = AudioSegment.from_file(io.BytesIO(audio_bytes), format="wav")
+    optimized = segment.set_frame_rate(16000).set_channels(1)
+    output_buffer = io.BytesIO()
+    optimized.export(output_buffer, format="wav")
+    body = output_buffer.getvalue()
+    return len(body)
+
+async def pooled_turn(service: DeepgramService, encoded: str) -> int:
+    """Current ingest path: pooled decode, memoryview processing, streamed body"""
+    pooled_buffer, audio_view = decode_base64_into(buffer_pool, encoded)
+    try:
+        payload = await service._process_audio_format(audio_view)
+        sent = 0
+        async for chunk in payload.stream():
+            sent += chunk.nbytes
+        return sent
+    finally:
+        buffer_pool.release(pooled_buffer)
+
+async def measure(label: str, turn, turns: int):
+    peaks = []
+    for _ in range(turns):
+        tracemalloc.start()
+        await turn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peaks.append(peak)
+
+    # First turn warms the buffer pool; report steady state separately
+    steady = peaks[1:] or peaks
+    print(f"{label:>8}: first turn peak {peaks[0] / 1024:,.0f} KiB, "
+          f"steady-state peak {sum(steady) / len(steady) / 1024:,.0f} KiB")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10.0, help="clip length")
+    parser.add_argument("--turns", type=int, default=5, help="turns per path")
+    args = parser.parse_args()
+
+    encoded = base64.b64encode(make_wav(args.seconds)).decode('ascii')
+    print(f"Clip: {args.seconds}s 48kHz stereo WAV, base64 text {len(encoded) / 1024:,.0f} KiB")
+
+    service = DeepgramService()
+    await measure("legacy", lambda: legacy_turn(encoded), args.turns)
+    await measure("pooled", lambda: pooled_turn(service, encoded), args.turns)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,120 @@
+"""
+Throughput benchmark for provider key pools
+Runs a local stub of the ElevenLabs API that allows a fixed number of
+concurrent requests per key (429 beyond that), then drives ElevenLabsService
+with one key and with a pool of keys and compares completed requests per second
+
+Usage (from the backend directory):
+    python tools/bench_key_pool.py [--keys 3] [--limit 4] [--requests 200] [--latency 0.05]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from typing import Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiohttp import web
+
+from config import settings
+from services.elevenlabs_service import ElevenLabsService
+
+class StubProvider:
+    """Enforces a per-key concurrency limit the way a provider account would"""
+
+    def __init__(self, limit: int, latency: float):
+        self.limit = limit
+        self.latency = latency
+        self.in_flight: Dict[str, int] = {}
+        self.served = 0
+        self.throttled = 0
+
+    async def synthesize(self, request: web.Request) -> web.Response:
+        api_key = request.headers.get("xi-api-key", "")
+        if self.in_flight.get(api_key, 0) >= self.limit:
+            self.throttled += 1
+            return web.json_response({"detail": "too_many_concurrent_requests"}, status=429,
+                                     headers={"Retry-After": "0.1"})
+
+        self.in_flight[api_key] = self.in_flight.get(api_key, 0) + 1
+        try:
+            await request.read()
+            await asyncio.sleep(self.latency)
+            self.served += 1
+            return web.Response(body=b"\xff\xfb" + b"\x00" * 1024, content_type="audio/mpeg")
+        finally:
+            self.in_flight[api_key] -= 1
+
+async def run_case(label: str, endpoint: str, keys: int, stub: StubProvider,
+                   requests: int, concurrency: int):
+    settings.ELEVENLABS_API_KEY = "stub-key-1"
+    settings.ELEVENLABS_API_KEYS = ",".join(f"stub-key-{index}" for index in range(2, keys + 1))
+    settings.ELEVENLABS_ENDPOINTS = endpoint
+    service = ElevenLabsService()
+    stub.served = stub.throttled = 0
+
+    # Distinct texts so request coalescing does not merge them
+    queue = asyncio.Queue()
+    for index in range(requests):
+        queue.put_nowait(f"request {index}")
+    attempts = 0
+
+    async def worker():
+        nonlocal attempts
+        while not queue.empty():
+            text = queue.get_nowait()
+            attempts += 1
+            if not await service.text_to_speech(text):
+                # Throttled: back off briefly and try again, as a caller would
+                queue.put_nowait(text)
+                await asyncio.sleep(0.01)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    await service.close()
+
+    print(f"{label:>10}: {requests} requests in {elapsed:.2f}s = {requests / elapsed:,.1f} req/s "
+          f"({attempts} attempts, {stub.throttled} throttled by the stub)")
+    for key in service.keys.stats()["keys"]:
+        print(f"{'':>12}{key['label']}: {key['requests']} requests, {key['throttled']} throttled")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--keys", type=int, default=3, help="keys in the pool")
+    parser.add_argument("--limit", type=int, default=4, help="concurrent requests allowed per key")
+    parser.add_argument("--requests", type=int, default=200, help="requests per case")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub response time (seconds)")
+    args = parser.parse_args()
+
+    # 429 errors and cooldown warnings are expected here; keep the report readable
+    logging.basicConfig(level=logging.CRITICAL)
+
+    stub = StubProvider(args.limit, args.latency)
+    app = web.Application()
+    app.router.add_post("/v1/text-to-speech/{voice_id}", stub.synthesize)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    endpoint = f"http://127.0.0.1:{port}/v1"
+
+    # Offer enough concurrency to saturate the whole pool in both cases
+    concurrency = args.keys * args.limit
+    single_key_limit = args.limit / args.latency
+    print(f"Stub: {args.limit} concurrent requests per key, {args.latency * 1000:.0f}ms each "
+          f"(single-key ceiling ~{single_key_limit:,.0f} req/s), client concurrency {concurrency}")
+
+    try:
+        await run_case("1 key", endpoint, 1, stub, args.requests, concurrency)
+        await run_case(f"{args.keys} keys", endpoint, args.keys, stub, args.requests, concurrency)
+    finally:
+        await runner.cleanup()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,200 @@
+"""
+Deterministic replay of recorded sessions
+Feeds .vrec recordings (see services/session_recorder.py) back through the
+server's message pipeline with local provider stand-ins that return the
+recorded outputs after the recorded stage latencies, then compares
+replayed turn latency against the recording
+
+Usage (from the backend directory):
+    python tools/replay.py recordings/*.vrec [--time-scale 1.0] [--no-pacing]
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from services.filler_audio import FillerLibrary
+from logging_config import client_id_var, turn_id_var
+from services.session_recorder import read_recording
+
+class ReplayStandIn:
+    """
+    Base for provider stand-ins; recorded turns are keyed by (client id, turn id)
+
+    process_audio_message numbers turns with session_recorder.next_turn_id and
+    publishes the number in turn_id_var, so a replayed session gets the same
+    turn ids as its recording, even when inputs or replies repeat (e.g. "evet")
+    """
+
+    def __init__(self, time_scale: float):
+        self.time_scale = time_scale
+        self.turns: Dict[Tuple[str, str], dict] = {}
+
+    def add(self, client_id: str, turn: dict):
+        if turn.get("turn_id") is not None:
+            self.turns[(client_id, str(turn["turn_id"]))] = turn
+
+    def current_turn(self) -> Optional[dict]:
+        return self.turns.get((client_id_var.get(), turn_id_var.get()))
+
+    async def delay(self, turn: dict, stage: str):
+        await asyncio.sleep(turn["timings"].get(stage, 0.0) * self.time_scale)
+
+class ReplayDeepgramService(ReplayStandIn):
+    async def transcribe_audio(self, audio_bytes, model=None, memory=None):
+        turn = self.current_turn()
+        if turn is None or not turn.get("audio"):
+            return "No speech detected"
+        await self.delay(turn, "stt")
+        return turn.get("transcript")
+
+class ReplayGeminiService(ReplayStandIn):
+    async def generate_response(self, user_input, model=None, max_tokens=None):
+        turn = self.current_turn()
+        if turn is None or "ai_response" not in turn:
+            return "I couldn't generate a response, please try again."
+        await self.delay(turn, "llm")
+        return turn["ai_response"]
+
+class ReplayElevenLabsService(ReplayStandIn):
+    async def text_to_speech(self, text, model_id=None, voice_id=None):
+        turn = self.current_turn()
+        if turn is None or not turn.get("tts_bytes"):
+            return None
+        await self.delay(turn, "tts")
+        return bytes(turn["tts_bytes"])
+
+class CaptureSocket:
+    """Stands in for the client WebSocket and records when each message arrives"""
+
+    def __init__(self):
+        self.messages: List[tuple] = []
+        self.completed = False
+        self.error: Optional[str] = None
+
+    def start_turn(self):
+        self.completed = False
+        self.error = None
+
+    async def send_text(self, data: str):
+        message = json.loads(data)
+        self.messages.append((time.perf_counter(), message["type"]))
+        # Only a delivered reply completes a turn; errors are reported separately
+        if message["type"] == "audio_response":
+            self.completed = True
+        elif message["type"] == "error" and self.error is None:
+            self.error = message.get("message", "")
+
+def to_message(turn: dict) -> dict:
+    if turn["message_type"] == "audio_data":
+        return {"type": "audio_data", "audio_data": base64.b64encode(turn["audio"]).decode('ascii')}
+    return {"type": "test_ai", "text": turn.get("input_text", "")}
+
+def replay_client_id(path: str) -> str:
+    return f"replay-{os.path.basename(path)}"
+
+async def replay_session(path: str, turns: List[dict], time_scale: float, pacing: bool) -> List[dict]:
+    client_id = replay_client_id(path)
+    client_id_var.set(client_id)  # Each gathered session runs in its own context
+    socket = CaptureSocket()
+    main.manager.active_connections[client_id] = socket
+    results = []
+    session_start = time.perf_counter()
+    first_turn_at = turns[0]["started_at"] if turns else 0.0
+
+    try:
+        for turn in turns:
+            if pacing:
+                # Keep the recorded gaps between turns (scaled)
+                due = session_start + (turn["started_at"] - first_turn_at) * time_scale
+                await asyncio.sleep(max(0.0, due - time.perf_counter()))
+
+            socket.start_turn()
+            started = time.perf_counter()
+            await main.process_audio_message(client_id, to_message(turn))
+            replayed = time.perf_counter() - started
+
+            timings = turn["timings"]
+            upstream = sum(timings.get(stage, 0.0) for stage in ("stt", "llm", "tts")) * time_scale
+            results.append({
+                "session": os.path.basename(path),
+                "turn_id": turn.get("turn_id"),
+                "recorded": timings.get("total", 0.0),
+                "replayed": replayed,
+                "overhead": replayed - upstream,
+                "completed": socket.completed,
+                "error": socket.error
+            })
+    finally:
+        main.manager.active_connections.pop(client_id, None)
+
+    return results
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+async def run(paths: List[str], time_scale: float, pacing: bool):
+    deepgram = ReplayDeepgramService(time_scale)
+    gemini = ReplayGeminiService(time_scale)
+    elevenlabs = ReplayElevenLabsService(time_scale)
+
+    sessions = []
+    for path in paths:
+        client_id = replay_client_id(path)
+        turns = [record for record in read_recording(path) if record["type"] == "turn"]
+        for turn in turns:
+            for stand_in in (deepgram, gemini, elevenlabs):
+                stand_in.add(client_id, turn)
+        sessions.append((path, turns))
+
+    # Route the pipeline to the stand-ins; nothing leaves the process
+    main.deepgram_service = deepgram
+    main.gemini_service = gemini
+    main.elevenlabs_service = elevenlabs
+    # Filler clips are rendered by the real TTS provider and are not recorded; replay without them
+    main.filler_library = FillerLibrary(elevenlabs, [], [])
+    main.session_recorder.enabled = False
+
+    # Sessions replay concurrently, as they arrived in production
+    per_session = await asyncio.gather(*(
+        replay_session(path, turns, time_scale, pacing) for path, turns in sessions
+    ))
+    results = [result for session in per_session for result in session]
+
+    print(f"{'session':<40} {'turn':>4} {'recorded':>9} {'replayed':>9} {'overhead':>9}  error")
+    for result in results:
+        status = "" if result["completed"] else "(incomplete)"
+        if result["error"]:
+            status = f"{status} {result['error']}".strip()
+        print(f"{result['session'][:40]:<40} {result['turn_id'] or '-':>4} "
+              f"{result['recorded'] * 1000:>7.0f}ms {result['replayed'] * 1000:>7.0f}ms "
+              f"{result['overhead'] * 1000:>7.1f}ms  {status}".rstrip())
+
+    recorded = [result["recorded"] for result in results]
+    replayed = [result["replayed"] for result in results]
+    overhead = [result["overhead"] for result in results]
+    failed = sum(1 for result in results if not result["completed"] or result["error"])
+    print(f"\n{len(results)} turns from {len(sessions)} sessions (time scale {time_scale}), {failed} failed")
+    for label, values in (("recorded", recorded), ("replayed", replayed), ("overhead", overhead)):
+        print(f"{label:>9}: p50 {percentile(values, 0.5) * 1000:.1f}ms  p95 {percentile(values, 0.95) * 1000:.1f}ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded sessions against local provider stand-ins")
+    parser.add_argument("paths", nargs="+", help=".vrec recording files")
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="multiplier for recorded latencies and gaps (0 = no upstream latency)")
+    parser.add_argument("--no-pacing", action="store_true", help="send turns back-to-back")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.paths, args.time_scale, not args.no_pacing))
@@ -11,6 +11,7 @@ class AudioService {
   private stream: MediaStream | null = null;
   private callbacks: AudioServiceCallbacks = {};
   private isRecording = false;
+  private playbackQueue: Promise<void> = Promise.resolve();
 
   public setCallbacks(callbacks: AudioServiceCallbacks) {
     this.callbacks = callbacks;
@@ -145,7 +146,14 @@ class AudioService {
     }
   }
 
-  public async playAudio(audioData: Uint8Array): Promise<void> {
+  public playAudio(audioData: Uint8Array): Promise<void> {
+    // Clips play back-to-back in arrival order (filler, then the reply)
+    const playback = this.playbackQueue.catch(() => undefined).then(() => this.playNow(audioData));
+    this.playbackQueue = playback;
+    return playback;
+  }
+
+  private async playNow(audioData: Uint8Array): Promise<void> {
     try {
       console.log('🔊 Playing audio...', audioData.length, 'bytes');
 
@@ -1,6 +1,6 @@
 // src/services/WebSocketService.ts
 export interface WebSocketMessage {
-  type: 'transcription' | 'ai_response' | 'audio_response' | 'status' | 'error' | 'pong';
+  type: 'transcription' | 'ai_response' | 'audio_response' | 'filler_audio' | 'status' | 'error' | 'pong';
   text?: string;
   audio_data?: string;
   message?: string;
@@ -114,6 +114,8 @@ class WebSocketService {
           break;
 
         case 'audio_response':
+        case 'filler_audio':
+          // Fillers play through the same queue, so the reply follows them
           if (message.audio_data) {
             try {
               const audioBytes = this.base64ToUint8Array(message.audio_data);